@@ -77,6 +77,7 @@ class GuiTop:
             "3": lambda: self.run_rule("aligned_potentials"),
             "4": lambda: self.run_rule("filled_cells"),
             "5": lambda: self.run_rule("filled_potentials"),
+            "s": self.solve,
         }
         for k, func in shortcuts.items():
             QShortcut(QKeySequence(k), self.main_widget).activated.connect(func)
@@ -162,6 +163,10 @@ class GuiTop:
         self.sudoku.run_rule(sudoku_rule)
         self.updater.updated.emit()
 
+    def solve(self) -> None:
+        _ = self.sudoku.solve_logically()
+        self.updater.updated.emit()
+
     def back(self):
         self.sudoku.replay_history("back")
         self.updater.updated.emit()
@@ -19,6 +19,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, Signal, QSize
 
 from gui.fixed_size_control import FixedSizeControl
+from sudoku.bitboard import count_solutions
 from sudoku.puzzleio import PuzzleList
 
 
@@ -247,7 +248,15 @@ class PuzzleListWidget(QDialog):
                 self.new_puzzle_input_error = True
             if len(input) > 81:
                 self.new_puzzle_input_error = True
-        if not self.new_puzzle_name_error and len(input) == 81:
+        if not self.new_puzzle_input_error and len(input) == 81:
+            # Only puzzles with exactly one solution are worth saving
+            if count_solutions(input) != 1:
+                self.new_puzzle_input_error = True
+        if (
+            not self.new_puzzle_name_error
+            and not self.new_puzzle_input_error
+            and len(input) == 81
+        ):
             self.verified_new_puzzle_input = input
         if self.verified_new_puzzle_name and self.verified_new_puzzle_input:
             self.save_button.setEnabled(True)
@@ -0,0 +1,249 @@
+"""Headless batch solving of puzzle files.
+
+Puzzles are streamed from files or stdin one line at a time and results are streamed to stdout as they are
+solved, so memory use does not depend on the size of the corpus. read_puzzles parses lines into (name, puzzle)
+pairs and solve_puzzles solves them with a single Sudoku reused for every puzzle, both are generators. Each result
+is written out by format_result as soon as it is ready.
+
+A line is either a bare puzzle string or a named one as in sudoku.yaml (name: "puzzle"). Puzzles are 81 characters
+with 0 or . for a blank, anything after a # is a comment. Nothing here imports the GUI.
+
+With more than one worker the stream is cut into chunks which are solved by a pool of processes. Each worker builds
+its Sudoku once and reuses it for every puzzle it gets. A chunk travels as the 81 byte ASCII puzzles back to back and
+comes back as 81 bytes of board plus a status byte per puzzle, the names never leave the parent. Only a few chunks
+per worker are in flight at a time, so memory stays bounded, and results come out in input order.
+
+Usage: python -m sudoku.batch [--method logic|search|dlx] [--workers N] [--chunksize N] [file ...]
+"""
+
+import argparse
+import concurrent.futures
+import fileinput
+import itertools
+import logging
+import sys
+from collections import deque
+from typing import Iterable, Iterator
+from sudoku import dlx
+from sudoku.defines import SUD_CELL_COUNT
+from sudoku.sudoku import Sudoku
+
+METHODS = ("logic", "search", "dlx")
+# Result status. When the logical rules get stuck the board holds what they found, when the puzzle has no solution
+# or the line is not a puzzle it is the puzzle as read
+SOLVED = "solved"
+STUCK = "stuck"
+UNSOLVABLE = "unsolvable"
+INVALID = "invalid"
+# Status byte of the worker encoding
+STATUSES = (SOLVED, STUCK, UNSOLVABLE, INVALID)
+# Chunks queued per worker
+CHUNKS_PER_WORKER = 2
+
+# Per worker process state, set up by _init_worker
+_worker_sudoku: Sudoku | None = None
+_worker_method = "search"
+
+BatchResult = tuple[str, str, str]
+
+
+def parse_line(line: str, number: int) -> tuple[str, str] | None:
+    """The (name, puzzle) on a line, None for a blank or comment line. Unnamed puzzles are named by line number.
+    The puzzle is returned as found apart from . blanks becoming 0, it is not checked here
+    """
+    line = line.split("#", 1)[0].strip()
+    if not line:
+        return None
+    name, sep, puzzle = line.rpartition(":")
+    if not sep:
+        name = str(number)
+    return name.strip(), puzzle.strip().strip("\"'").replace(".", "0")
+
+
+def read_puzzles(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    for number, line in enumerate(lines, 1):
+        parsed = parse_line(line, number)
+        if parsed is not None:
+            yield parsed
+
+
+def valid_puzzle(puzzle: str) -> bool:
+    return len(puzzle) == SUD_CELL_COUNT and puzzle.isdigit() and puzzle.isascii()
+
+
+def solve_puzzle(sudoku: Sudoku, puzzle: str, method: str) -> tuple[str, str]:
+    """Solve one puzzle, returns the board and the status"""
+    if not valid_puzzle(puzzle):
+        return puzzle, INVALID
+    if method == "dlx":
+        solution = dlx.solve(puzzle)
+        return (puzzle, UNSOLVABLE) if solution is None else (solution, SOLVED)
+    sudoku.load_sud(puzzle)
+    sudoku.initialize()
+    if method == "logic":
+        report = sudoku.solve_logically(record_history=False)
+        solved = report.solved
+    else:
+        solved = sudoku.search(record_history=False).solved
+    if solved and not sudoku.in_error:
+        return sudoku.to_sud(), SOLVED
+    if sudoku.in_error or method == "search":
+        return puzzle, UNSOLVABLE
+    return sudoku.to_sud(), STUCK
+
+
+def solve_puzzles(
+    puzzles: Iterable[tuple[str, str]], method: str = "search"
+) -> Iterator[BatchResult]:
+    """Solve (name, puzzle) pairs in order, yielding (name, board, status) for each. One Sudoku is built and
+    reused for all of them"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}")
+    sudoku = Sudoku()
+    for name, puzzle in puzzles:
+        board, status = solve_puzzle(sudoku, puzzle, method)
+        yield name, board, status
+
+
+def encode_puzzles(puzzles: Iterable[str]) -> bytes:
+    return "".join(puzzles).encode("ascii")
+
+
+def decode_puzzles(data: bytes) -> list[str]:
+    text = data.decode("ascii")
+    return [text[i : i + SUD_CELL_COUNT] for i in range(0, len(text), SUD_CELL_COUNT)]
+
+
+def encode_results(results: Iterable[tuple[str, str]]) -> bytes:
+    """(board, status) pairs as the board characters followed by the status byte"""
+    data = bytearray()
+    for board, status in results:
+        data += board.encode("ascii")
+        data.append(STATUSES.index(status))
+    return bytes(data)
+
+
+def decode_results(data: bytes) -> list[tuple[str, str]]:
+    size = SUD_CELL_COUNT + 1
+    return [
+        (
+            data[i : i + SUD_CELL_COUNT].decode("ascii"),
+            STATUSES[data[i + SUD_CELL_COUNT]],
+        )
+        for i in range(0, len(data), size)
+    ]
+
+
+def _init_worker(method: str) -> None:
+    global _worker_sudoku, _worker_method
+    _worker_sudoku = Sudoku()
+    _worker_method = method
+
+
+def _solve_chunk(data: bytes) -> bytes:
+    sudoku = _worker_sudoku
+    assert sudoku is not None
+    return encode_results(
+        solve_puzzle(sudoku, puzzle, _worker_method) for puzzle in decode_puzzles(data)
+    )
+
+
+def solve_puzzles_parallel(
+    puzzles: Iterable[tuple[str, str]],
+    method: str = "search",
+    workers: int = 2,
+    chunksize: int = 64,
+) -> Iterator[BatchResult]:
+    """solve_puzzles spread over a pool of workers processes, chunksize puzzles at a time. Results are yielded in
+    the order of the puzzles"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}")
+    if workers < 1 or chunksize < 1:
+        raise ValueError("workers and chunksize have to be at least 1")
+    puzzles = iter(puzzles)
+    in_flight: deque[tuple[list[tuple[str, str]], concurrent.futures.Future]] = deque()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(method,)
+    ) as executor:
+        while True:
+            while len(in_flight) < workers * CHUNKS_PER_WORKER:
+                chunk = list(itertools.islice(puzzles, chunksize))
+                if not chunk:
+                    break
+                # Only proper puzzle strings are sent, the rest are answered here
+                data = encode_puzzles(p for _, p in chunk if valid_puzzle(p))
+                in_flight.append((chunk, executor.submit(_solve_chunk, data)))
+            if not in_flight:
+                return
+            chunk, future = in_flight.popleft()
+            results = iter(decode_results(future.result()))
+            for name, puzzle in chunk:
+                if valid_puzzle(puzzle):
+                    board, status = next(results)
+                    yield name, board, status
+                else:
+                    yield name, puzzle, INVALID
+
+
+def positive_int(value: str) -> int:
+    """argparse type for a count of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def format_result(result: BatchResult) -> str:
+    """A result as a line in the sudoku.yaml format with the status as a comment"""
+    name, board, status = result
+    return f'{name}: "{board}"  # {status}\n'
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Solve the puzzles in the files named in argv (stdin if none or -) and write the results to stdout. Returns 1
+    if any puzzle wasn't solved"""
+    parser = argparse.ArgumentParser(description="Solve sudoku puzzles in batch")
+    parser.add_argument(
+        "files", nargs="*", help="puzzle files, one puzzle a line (default stdin)"
+    )
+    parser.add_argument(
+        "--method",
+        choices=METHODS,
+        default="search",
+        help="logic: the logical rules only, search: rules and speculative search, dlx: dancing links",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="number of worker processes, 1 solves in this process (default 1)",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=positive_int,
+        default=64,
+        help="puzzles sent to a worker at a time (default 64)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log the solver's progress"
+    )
+    args = parser.parse_args(argv)
+    # Contradictions are logged as errors by the solver, they are expected here and show up in the status
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    all_solved = True
+    with fileinput.input(args.files) as lines:
+        puzzles = read_puzzles(lines)
+        if args.workers > 1:
+            results = solve_puzzles_parallel(
+                puzzles, args.method, args.workers, args.chunksize
+            )
+        else:
+            results = solve_puzzles(puzzles, args.method)
+        for result in results:
+            sys.stdout.write(format_result(result))
+            all_solved &= result[2] == SOLVED
+    return 0 if all_solved else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Whole board bitboard engine, one 81 bit int per digit.
+
+Bit i of candidates[d - 1] is set while digit d is still possible in the cell with id i (the NineSquare cell ids
+used by the rest of the package, see sudoku.topology). With the precomputed 81 bit masks of every unit and of the
+peers of every cell:
+* placing a digit is candidates[d - 1] &= ~PEER_BITS[cell] plus clearing the cell from the other digits
+* a hidden single is a unit where candidates[d - 1] & UNIT_BITS[u] has one bit
+* a naked single is a cell set in exactly one digit's candidates, found for the whole board at once by counting
+  bits in parallel across the 9 ints
+* fish patterns are popcounts of candidates masked by rows or columns
+
+count_solutions runs a complete search on bitboards: propagate the singles, then branch on a cell with the fewest
+candidates on a copy of the board, stopping as soon as it has found as many solutions as it was asked for.
+
+There are no Cell objects or per cell Python state, a board is 9 ints plus two masks, so copies are cheap. This is
+the engine for bulk work (searching, counting solutions, batches of puzzles). The Sudoku/Cell API stays the
+interactive view, from_board and write_to convert between the two.
+"""
+
+import itertools
+from typing import Iterator
+from sudoku.bitmask import DIGIT_MASK, MASK_DIGITS, POPCOUNT
+from sudoku.board import BoardState
+from sudoku.defines import SUD_CELL_COUNT, SUD_RANGE, SUD_SPACE_SIZE
+from sudoku.topology import COL_UNITS, PEERS, ROW_MAJOR, ROW_UNITS, UNITS
+
+ALL_CELLS = (1 << SUD_CELL_COUNT) - 1
+CELL_BIT: tuple[int, ...] = tuple(1 << i for i in range(SUD_CELL_COUNT))
+UNIT_BITS: tuple[int, ...] = tuple(sum(CELL_BIT[i] for i in unit) for unit in UNITS)
+PEER_BITS: tuple[int, ...] = tuple(
+    sum(CELL_BIT[p] for p in PEERS[i]) for i in range(SUD_CELL_COUNT)
+)
+# Position of each cell id in an 81 character puzzle string, the inverse of ROW_MAJOR
+READING_POS: tuple[int, ...] = tuple(ROW_MAJOR.index(i) for i in range(SUD_CELL_COUNT))
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Indices of the set bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class BitBoard:
+    """A sudoku board as 9 candidate bitboards, the cells placed for each digit and the unsolved cells"""
+
+    __slots__ = ("candidates", "placed", "unsolved")
+
+    def __init__(self) -> None:
+        self.candidates = [ALL_CELLS] * SUD_SPACE_SIZE
+        self.placed = [0] * SUD_SPACE_SIZE
+        self.unsolved = ALL_CELLS
+
+    @classmethod
+    def from_string(cls, puzzle: str) -> "BitBoard":
+        """Load an 81 character puzzle string in reading order, 0 (or .) for a blank. Raises ValueError if the
+        givens contradict each other"""
+        if len(puzzle) != SUD_CELL_COUNT:
+            raise ValueError
+        board = cls()
+        for pos, val in enumerate(puzzle):
+            if val not in "0.":
+                if not board.place(ROW_MAJOR[pos], int(val)):
+                    raise ValueError
+        return board
+
+    @classmethod
+    def from_board(cls, state: BoardState) -> "BitBoard":
+        """Copy the solutions and potentials of a full size BoardState"""
+        board = cls()
+        board.candidates = [0] * SUD_SPACE_SIZE
+        for i in range(SUD_CELL_COUNT):
+            val = state.solutions[i]
+            if val:
+                board.placed[val - 1] |= CELL_BIT[i]
+                board.unsolved &= ~CELL_BIT[i]
+            else:
+                for d in SUD_RANGE:
+                    if state.masks[i] & DIGIT_MASK[d]:
+                        board.candidates[d - 1] |= CELL_BIT[i]
+        return board
+
+    def write_to(self, state: BoardState) -> None:
+        """Place every solution found on this bitboard onto a BoardState and remove the potentials it ruled out"""
+        for d in SUD_RANGE:
+            for i in iter_bits(self.placed[d - 1]):
+                if state.solutions[i] != d:
+                    state.place(i, d)
+        for i in iter_bits(self.unsolved):
+            state.remove(i, ~self.cell_mask(i))
+        state.propagate()
+
+    def copy(self) -> "BitBoard":
+        board = BitBoard.__new__(BitBoard)
+        board.candidates = self.candidates[:]
+        board.placed = self.placed[:]
+        board.unsolved = self.unsolved
+        return board
+
+    def cell_mask(self, cell: int) -> int:
+        """Candidate mask (see sudoku.bitmask) of a cell"""
+        bit = CELL_BIT[cell]
+        mask = 0
+        for d in range(SUD_SPACE_SIZE):
+            if self.candidates[d] & bit:
+                mask |= 1 << d
+        return mask
+
+    def place(self, cell: int, val: int) -> bool:
+        """Place val in cell and remove it from the cell's peers. Returns False if val is not possible there"""
+        bit = CELL_BIT[cell]
+        candidates = self.candidates
+        if not candidates[val - 1] & bit or not self.unsolved & bit:
+            return False
+        for d in range(SUD_SPACE_SIZE):
+            candidates[d] &= ~bit
+        candidates[val - 1] &= ~PEER_BITS[cell]
+        self.placed[val - 1] |= bit
+        self.unsolved &= ~bit
+        return True
+
+    @property
+    def solved(self) -> bool:
+        return not self.unsolved
+
+    def to_string(self) -> str:
+        """The placed digits as an 81 character string in reading order, 0 for unsolved"""
+        out = ["0"] * SUD_CELL_COUNT
+        for d in range(SUD_SPACE_SIZE):
+            for i in iter_bits(self.placed[d]):
+                out[READING_POS[i]] = str(d + 1)
+        return "".join(out)
+
+    def fewest_candidates(self) -> int:
+        """An unsolved cell with the fewest candidates, preferring the lowest cell id. A cell with two candidates
+        is taken straight away, after propagate_singles that is the fewest there can be
+        """
+        ones = twos = threes = 0
+        for c in self.candidates:
+            threes |= twos & c
+            twos |= ones & c
+            ones |= c
+        pairs = twos & ~threes & self.unsolved
+        if pairs:
+            return (pairs & -pairs).bit_length() - 1
+        best, best_count = -1, SUD_SPACE_SIZE + 1
+        for i in iter_bits(self.unsolved):
+            count = POPCOUNT[self.cell_mask(i)]
+            if count < best_count:
+                best, best_count = i, count
+        return best
+
+    def candidate_counts(self) -> tuple[int, int]:
+        """Bitboards of the cells with at least one and at least two candidates, counted in parallel over the
+        whole board"""
+        ones = twos = 0
+        for c in self.candidates:
+            twos |= ones & c
+            ones |= c
+        return ones, twos
+
+    def naked_singles(self) -> int:
+        """Bitboard of the unsolved cells with exactly one candidate"""
+        ones, twos = self.candidate_counts()
+        return ones & ~twos & self.unsolved
+
+    def hidden_singles(self) -> list[tuple[int, int]]:
+        """(cell, val) for every digit which has a single place left in a unit"""
+        singles = []
+        for d, c in enumerate(self.candidates):
+            for unit in UNIT_BITS:
+                bits = c & unit
+                if bits and not bits & (bits - 1):
+                    singles.append((bits.bit_length() - 1, d + 1))
+        return singles
+
+    def contradiction(self) -> bool:
+        """True if an unsolved cell has no candidates or a digit has nowhere left to go in a unit"""
+        ones, _ = self.candidate_counts()
+        if self.unsolved & ~ones:
+            return True
+        for d in range(SUD_SPACE_SIZE):
+            possible = self.candidates[d] | self.placed[d]
+            for unit in UNIT_BITS:
+                if not possible & unit:
+                    return True
+        return False
+
+    def propagate_singles(self) -> bool:
+        """Place naked and hidden singles until there are none left. Returns False on a contradiction"""
+        while self.unsolved:
+            if self.contradiction():
+                return False
+            progress = False
+            singles = self.naked_singles()
+            for i in iter_bits(singles):
+                # An earlier placement may have taken the last candidate, that shows up as a contradiction
+                mask = self.cell_mask(i)
+                if mask:
+                    progress |= self.place(i, MASK_DIGITS[mask][0])
+            if not progress:
+                for cell, val in self.hidden_singles():
+                    if self.unsolved & CELL_BIT[cell]:
+                        if not self.place(cell, val):
+                            return False
+                        progress = True
+            if not progress:
+                return True
+        return not self.contradiction()
+
+    def fish(self, val: int, size: int) -> bool:
+        """Basic fish of size (2 x-wing, 3 swordfish, ...) for val, both row and column based. Returns True if any
+        candidate was removed"""
+        progress = False
+        c = self.candidates[val - 1]
+        for bases, covers in ((ROW_UNITS, COL_UNITS), (COL_UNITS, ROW_UNITS)):
+            lines = [u for u in bases if 2 <= (c & UNIT_BITS[u]).bit_count() <= size]
+            for combo in itertools.combinations(lines, size):
+                base_bits = 0
+                for u in combo:
+                    base_bits |= UNIT_BITS[u]
+                cover = [u for u in covers if c & base_bits & UNIT_BITS[u]]
+                if len(cover) == size:
+                    # The candidates in the base lines all lie in the cover lines, so the rest of the cover goes
+                    cover_bits = 0
+                    for u in cover:
+                        cover_bits |= UNIT_BITS[u]
+                    removed = c & cover_bits & ~base_bits
+                    if removed:
+                        c &= ~removed
+                        progress = True
+        self.candidates[val - 1] = c
+        return progress
+
+
+def _count(board: BitBoard, limit: int) -> int:
+    if not board.propagate_singles():
+        return 0
+    if board.solved:
+        return 1
+    cell = board.fewest_candidates()
+    found = 0
+    for val in MASK_DIGITS[board.cell_mask(cell)]:
+        branch = board.copy()
+        _ = branch.place(cell, val)
+        found += _count(branch, limit - found)
+        if found >= limit:
+            break
+    return found
+
+
+def count_solutions(puzzle: str, limit: int = 2) -> int:
+    """Number of solutions of an 81 character puzzle string, counting stops at limit. With the default limit of 2
+    the answer is 0 (no solution, including contradicting givens), 1 (a proper puzzle) or 2 (more than one
+    solution). Raises ValueError if puzzle is not a puzzle string"""
+    if len(puzzle) != SUD_CELL_COUNT or not all(c in "0123456789." for c in puzzle):
+        raise ValueError
+    try:
+        board = BitBoard.from_string(puzzle)
+    except ValueError:
+        return 0
+    if limit <= 0:
+        return 0
+    return _count(board, limit)
@@ -0,0 +1,37 @@
+"""Lookup tables for the 9-bit candidate masks used to store cell potentials.
+
+Digit d (1-9) is stored in bit d - 1, so a cell with every potential open has the mask 0x1FF. All of the tables
+below are indexed by a mask (0 - 511) and are computed once at import time so that the rules never have to
+loop over bits or build sets in their inner loops.
+"""
+
+from sudoku.defines import SUD_RANGE, SUD_SPACE_SIZE
+
+MASK_SIZE = 1 << SUD_SPACE_SIZE
+ALL_DIGITS = MASK_SIZE - 1
+
+# DIGIT_MASK[d] is the single bit mask for digit d. Index 0 is an empty mask so a blank cell (solution 0/None)
+# can be looked up without a special case.
+DIGIT_MASK: tuple[int, ...] = (0,) + tuple(1 << (d - 1) for d in SUD_RANGE)
+
+# Digits present in a mask in ascending order
+MASK_DIGITS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(d for d in SUD_RANGE if m & DIGIT_MASK[d]) for m in range(MASK_SIZE)
+)
+
+# Set views of a mask, shared so that the compatibility properties on Cell never allocate
+MASK_SETS: tuple[frozenset[int], ...] = tuple(frozenset(d) for d in MASK_DIGITS)
+
+# Number of potentials in a mask
+POPCOUNT: tuple[int, ...] = tuple(len(d) for d in MASK_DIGITS)
+
+# The digit a mask holds if exactly one bit is set, otherwise 0
+SINGLE_DIGIT: tuple[int, ...] = tuple(d[0] if len(d) == 1 else 0 for d in MASK_DIGITS)
+
+
+def digits_to_mask(digits) -> int:
+    """Convert an iterable of digits 1-9 into a candidate mask"""
+    mask = 0
+    for d in digits:
+        mask |= DIGIT_MASK[d]
+    return mask
@@ -0,0 +1,425 @@
+import logging
+from array import array
+from collections import deque
+from sudoku.bitmask import ALL_DIGITS, DIGIT_MASK, MASK_DIGITS
+from sudoku.defines import SUD_CELL_COUNT, SUD_SPACE_SIZE
+from sudoku.topology import CELL_UNIT_POS, CELL_UNITS, PEERS, UNIT_COUNT, UNITS
+
+logger = logging.getLogger(__name__)
+
+# The board buffer is split into one section per field, each section holding one word per cell
+SOLUTION = 0
+INITIAL = 1
+MASK = 2
+ELIMINATED = 3
+FLAGS = 4
+FIELD_COUNT = 5
+
+# Bits of the FLAGS field
+FLAG_NEW_SOLUTION = 0x1
+FLAG_SPECULATIVE = 0x2
+FLAG_ERROR = 0x4
+FLAG_PENDING = 0x8  # solution has not been pushed out to the peers yet
+
+# For each cell the (row, col, square) entries of the location index: offset of the unit's digits and the cell's
+# position bit within the unit
+LOCATION_SLOTS: tuple[tuple[tuple[int, int], ...], ...] = tuple(
+    tuple(
+        (u * SUD_SPACE_SIZE, 1 << pos)
+        for u, pos in zip(CELL_UNITS[i], CELL_UNIT_POS[i])
+    )
+    for i in range(SUD_CELL_COUNT)
+)
+# A blank full board, every potential of every cell open, and its location index, every digit in every position.
+# Clearing a board copies these rather than building them cell by cell
+BLANK_BOARD = array(
+    "H",
+    (
+        ALL_DIGITS if f == MASK else 0
+        for f in range(FIELD_COUNT)
+        for _ in range(SUD_CELL_COUNT)
+    ),
+)
+BLANK_LOCATIONS = array("H", [ALL_DIGITS] * UNIT_COUNT * SUD_SPACE_SIZE)
+
+
+class BoardState:
+    """Compact storage for the state of every cell on a board.
+    All of the cell state lives in one contiguous array of 16 bit words, indexed by cell id 0..size-1 within each
+    field section:
+    * solutions - solved value, 0 if unsolved
+    * initials - initial value, 0 if blank
+    * masks - potentials as a 9-bit candidate mask (see sudoku.bitmask)
+    * eliminated - mask of potentials removed since the last clear
+    * flags - new solution, speculative, error and pending bits
+    Cells are thin views into this structure, so copying a board is a single buffer copy (snapshot/restore).
+
+    A full size board also runs constraint propagation. Every placed solution is queued and propagate() pushes
+    the queued solutions out to the peers of each cell. The queue is mirrored by the pending flag so that it
+    survives a snapshot/restore.
+
+    A full size board also keeps aggregate counters up to date as solutions are placed so that consistency and
+    solved checks never have to walk the board:
+    * unit_digits - per unit mask of the digits solved in that unit
+    * unit_solved - per unit count of solved cells
+    * solved_count - number of solved cells on the board
+    * error_cells - ids of the cells flagged in error
+    * locations - unit x digit index, entry unit * 9 + digit - 1 is a mask of the positions within the unit
+      (see CELL_UNIT_POS) where the digit is still a potential
+    The counters are derived from the buffer and rebuilt on restore.
+
+    Every change to the potentials or solution of a cell also stamps the cell's units with the current value of a
+    change clock (unit_stamps), so a rule engine can tell whether a unit changed since it last looked at it. The
+    clock only moves forward, restore and clear stamp every unit.
+
+    The ids of the cells written since the last mark are logged in changed, so delta_since only has to compare
+    the cells which were written rather than the whole board.
+    """
+
+    __slots__ = (
+        "size",
+        "data",
+        "solutions",
+        "initials",
+        "masks",
+        "eliminated",
+        "flags",
+        "pending",
+        "unit_digits",
+        "unit_solved",
+        "solved_count",
+        "error_cells",
+        "_digit_counts",
+        "unit_stamps",
+        "clock",
+        "locations",
+        "changed",
+        "_mark",
+    )
+
+    def __init__(self, size: int = SUD_CELL_COUNT) -> None:
+        self.size = size
+        self.data = array("H", bytes(2 * FIELD_COUNT * size))
+        view = memoryview(self.data)
+        self.solutions = view[SOLUTION * size : (SOLUTION + 1) * size]
+        self.initials = view[INITIAL * size : (INITIAL + 1) * size]
+        self.masks = view[MASK * size : (MASK + 1) * size]
+        self.eliminated = view[ELIMINATED * size : (ELIMINATED + 1) * size]
+        self.flags = view[FLAGS * size : (FLAGS + 1) * size]
+        self.pending: deque[int] = deque()
+        self.unit_digits = array("H", bytes(2 * UNIT_COUNT))
+        self.unit_solved = bytearray(UNIT_COUNT)
+        # Number of times each digit is solved in each unit, more than one is a duplicate
+        self._digit_counts = bytearray(UNIT_COUNT * SUD_SPACE_SIZE)
+        self.solved_count = 0
+        self.error_cells: set[int] = set()
+        self.clock = 0
+        self.unit_stamps = [0] * UNIT_COUNT
+        self.locations = array("H", bytes(2 * UNIT_COUNT * SUD_SPACE_SIZE))
+        self.changed: set[int] = set()
+        self._mark: bytes | None = None
+        self.clear()
+
+    @property
+    def full_board(self) -> bool:
+        """True if this board covers all 81 cells and so has the standard topology"""
+        return self.size == SUD_CELL_COUNT
+
+    @property
+    def solved(self) -> bool:
+        return self.solved_count == self.size
+
+    def clear(self) -> None:
+        """Reset every cell to blank with all potentials open"""
+        if not self.full_board:
+            self.data[:] = array("H", bytes(2 * FIELD_COUNT * self.size))
+            for i in range(self.size):
+                self.masks[i] = ALL_DIGITS
+            self._recount()
+            return
+        # Nothing is solved, pending or in error on a blank board, so the counters are known without a recount
+        self.data[:] = BLANK_BOARD
+        self.locations[:] = BLANK_LOCATIONS
+        self.changed.update(range(self.size))
+        self.clock += 1
+        self.unit_stamps[:] = [self.clock] * UNIT_COUNT
+        self.pending = deque()
+        self.error_cells = set()
+        self.solved_count = 0
+        self.unit_digits[:] = array("H", bytes(2 * UNIT_COUNT))
+        self.unit_solved[:] = bytes(UNIT_COUNT)
+        self._digit_counts[:] = bytes(len(self._digit_counts))
+
+    def blank(self, index: int) -> bool:
+        """True if a cell is as clear left it: no value, every potential open, no highlights or flags"""
+        return (
+            not self.solutions[index]
+            and not self.initials[index]
+            and self.masks[index] == ALL_DIGITS
+            and not self.eliminated[index]
+            and not self.flags[index]
+        )
+
+    def snapshot(self) -> bytes:
+        """Return an immutable copy of the whole board"""
+        return self.data.tobytes()
+
+    def restore(self, snapshot: bytes) -> None:
+        """Restore a board previously saved with snapshot"""
+        memoryview(self.data).cast("B")[:] = snapshot
+        self._recount()
+
+    def mark(self) -> bytes:
+        """A snapshot which also starts a new log of changed cells, see delta_since"""
+        self.changed = set()
+        self._mark = self.snapshot()
+        return self._mark
+
+    def delta_since(self, snapshot: bytes) -> array:
+        """Record the changes made to the board since snapshot as a compact delta journal.
+        The delta holds one entry per changed cell: the cell index followed by the XOR of the old and new value
+        of each field (solution placed, potentials removed, eliminated highlights and flags). Applying the delta
+        with apply_delta toggles the board between the two states, so the same delta serves for undo and redo.
+        For the snapshot of the last mark only the cells logged since then are compared, otherwise every cell is
+        """
+        old = memoryview(snapshot).cast("H")
+        words = self.data
+        size = self.size
+        if snapshot is self._mark:
+            cells = sorted(self.changed)
+        else:
+            cells = range(size)
+        delta = array("H")
+        for i in cells:
+            xors = [words[f * size + i] ^ old[f * size + i] for f in range(FIELD_COUNT)]
+            if any(xors):
+                delta.append(i)
+                delta.extend(xors)
+        return delta
+
+    def apply_delta(self, delta: array) -> None:
+        """Undo or redo the changes recorded by delta_since, updating the counters cell by cell"""
+        words = self.data
+        size = self.size
+        solutions, flags = self.solutions, self.flags
+        pending_changed = False
+        for e in range(0, len(delta), FIELD_COUNT + 1):
+            i = delta[e]
+            self.touch(i)
+            old_solution, old_flags = solutions[i], flags[i]
+            for f in range(FIELD_COUNT):
+                words[f * size + i] ^= delta[e + 1 + f]
+            self._relocate(i, delta[e + 1 + MASK])
+            if solutions[i] != old_solution:
+                if old_solution:
+                    self._uncount_solution(i, old_solution)
+                if solutions[i]:
+                    self._count_solution(i, solutions[i])
+            if flags[i] & FLAG_ERROR:
+                self.error_cells.add(i)
+            else:
+                self.error_cells.discard(i)
+            pending_changed |= bool((flags[i] ^ old_flags) & FLAG_PENDING)
+        if pending_changed:
+            self.pending = deque(i for i in range(size) if flags[i] & FLAG_PENDING)
+
+    def touch(self, index: int) -> None:
+        """Stamp the units of a cell as changed"""
+        self.changed.add(index)
+        self.clock += 1
+        if self.full_board:
+            for u in CELL_UNITS[index]:
+                self.unit_stamps[u] = self.clock
+
+    def set_mask(self, index: int, mask: int) -> None:
+        """Overwrite the potentials of a cell"""
+        self._relocate(index, self.masks[index] ^ mask)
+        self.masks[index] = mask
+        self.touch(index)
+
+    def _relocate(self, index: int, changed: int) -> None:
+        """Toggle the location index entries of a cell for every digit in changed"""
+        if not self.full_board:
+            return
+        locations = self.locations
+        for d in MASK_DIGITS[changed]:
+            for offset, bit in LOCATION_SLOTS[index]:
+                locations[offset + d - 1] ^= bit
+
+    def digit_locations(self, unit: int, val: int) -> int:
+        """Mask of the positions within unit where val is still a potential"""
+        return self.locations[unit * SUD_SPACE_SIZE + val - 1]
+
+    def _recount(self) -> None:
+        """Rebuild the propagation queue and the aggregate counters from the buffer"""
+        self.changed.update(range(self.size))
+        self.clock += 1
+        self.unit_stamps[:] = [self.clock] * UNIT_COUNT
+        self.locations[:] = array("H", bytes(2 * len(self.locations)))
+        for i in range(self.size):
+            self._relocate(i, self.masks[i])
+        flags, solutions = self.flags, self.solutions
+        self.pending = deque(i for i in range(self.size) if flags[i] & FLAG_PENDING)
+        self.error_cells = {i for i in range(self.size) if flags[i] & FLAG_ERROR}
+        self.solved_count = 0
+        for u in range(UNIT_COUNT):
+            self.unit_digits[u] = 0
+            self.unit_solved[u] = 0
+        self._digit_counts[:] = bytes(len(self._digit_counts))
+        for i in range(self.size):
+            if solutions[i]:
+                self._count_solution(i, solutions[i])
+
+    def _count_solution(self, index: int, val: int) -> bool:
+        """Add a solution to the counters. Returns False if the digit was already solved in one of its units"""
+        self.solved_count += 1
+        if not self.full_board:
+            return True
+        ok = True
+        bit = DIGIT_MASK[val]
+        for u in CELL_UNITS[index]:
+            self.unit_solved[u] += 1
+            self._digit_counts[u * SUD_SPACE_SIZE + val - 1] += 1
+            if self.unit_digits[u] & bit:
+                ok = False
+            self.unit_digits[u] |= bit
+        return ok
+
+    def _uncount_solution(self, index: int, val: int) -> None:
+        self.solved_count -= 1
+        if not self.full_board:
+            return
+        for u in CELL_UNITS[index]:
+            self.unit_solved[u] -= 1
+            count = u * SUD_SPACE_SIZE + val - 1
+            self._digit_counts[count] -= 1
+            if not self._digit_counts[count]:
+                self.unit_digits[u] &= ~DIGIT_MASK[val]
+
+    def _mark_duplicates(self, index: int, val: int) -> None:
+        """Flag every cell which shares a unit and a solution with the cell at index"""
+        solutions = self.solutions
+        for u in CELL_UNITS[index]:
+            if self._digit_counts[u * SUD_SPACE_SIZE + val - 1] > 1:
+                logger.error(
+                    "Found more than one solution for solution %d in unit %d cell %d",
+                    val,
+                    u,
+                    index,
+                )
+                for i in UNITS[u]:
+                    if solutions[i] == val:
+                        self.mark_error(i)
+
+    def mark_error(self, index: int) -> None:
+        self.changed.add(index)
+        self.flags[index] |= FLAG_ERROR
+        self.error_cells.add(index)
+
+    def digit_solved_in_unit(self, unit: int, val: int) -> bool:
+        return bool(self.unit_digits[unit] & DIGIT_MASK[val])
+
+    def initialize_cell(self, index: int, val: int) -> bool:
+        """Set a cell to an initial value 1-9, or blank with all potentials open for 0. Clears all the flags.
+        Returns False if the value duplicates one already solved in the cell's units"""
+        if self.solutions[index]:
+            self._uncount_solution(index, self.solutions[index])
+        self.touch(index)
+        self.flags[index] = 0
+        self.error_cells.discard(index)
+        self.eliminated[index] = 0
+        self.initials[index] = val
+        self.solutions[index] = val
+        mask = 0 if val else ALL_DIGITS
+        self._relocate(index, self.masks[index] ^ mask)
+        self.masks[index] = mask
+        if not val:
+            return True
+        self.queue_placement(index)
+        if not self._count_solution(index, val):
+            self._mark_duplicates(index, val)
+            return False
+        return True
+
+    def place(self, index: int, val: int) -> bool:
+        """Set the solution of a cell, clear its potentials and queue it for propagation.
+        Returns False if the value duplicates one already solved in the cell's units, the duplicates are flagged
+        """
+        if self.solutions[index]:
+            self._uncount_solution(index, self.solutions[index])
+        self.touch(index)
+        self.solutions[index] = val
+        self.flags[index] |= FLAG_NEW_SOLUTION
+        self._relocate(index, self.masks[index])
+        self.masks[index] = 0
+        self.queue_placement(index)
+        if not self._count_solution(index, val):
+            self._mark_duplicates(index, val)
+            return False
+        return True
+
+    def remove(self, index: int, mask: int) -> bool:
+        """Remove every potential in mask from a cell. An unsolved cell left with no potentials is flagged in
+        error. Returns True if anything was removed"""
+        removed = self.masks[index] & mask
+        if removed:
+            self.touch(index)
+            self._relocate(index, removed)
+            self.masks[index] ^= removed
+            self.eliminated[index] |= removed
+            if not self.masks[index] and not self.solutions[index]:
+                self.mark_error(index)
+            return True
+        return False
+
+    def clear_step_marks(self) -> None:
+        """Clear the eliminated and new solution highlights of every cell"""
+        eliminated, flags = self.eliminated, self.flags
+        for i in range(self.size):
+            if eliminated[i] or flags[i] & FLAG_NEW_SOLUTION:
+                self.changed.add(i)
+                eliminated[i] = 0
+                flags[i] &= ~FLAG_NEW_SOLUTION
+
+    def queue_placement(self, index: int) -> None:
+        """Queue a newly placed solution to be pushed out to its peers by propagate"""
+        if self.full_board and not self.flags[index] & FLAG_PENDING:
+            self.changed.add(index)
+            self.flags[index] |= FLAG_PENDING
+            self.pending.append(index)
+
+    def propagate(self) -> bool:
+        """Work through the queue of placed solutions removing each one from the potentials of its 20 peers.
+        An unsolved peer left without potentials is marked in error. Returns True if any potential was removed
+        """
+        progress = False
+        pending = self.pending
+        solutions, masks, eliminated, flags = (
+            self.solutions,
+            self.masks,
+            self.eliminated,
+            self.flags,
+        )
+        if pending:
+            self.clock += 1
+        clock, stamps, locations = self.clock, self.unit_stamps, self.locations
+        changed = self.changed
+        while pending:
+            i = pending.popleft()
+            changed.add(i)
+            flags[i] &= ~FLAG_PENDING
+            bit = DIGIT_MASK[solutions[i]]
+            digit = solutions[i] - 1
+            for p in PEERS[i]:
+                if masks[p] & bit:
+                    changed.add(p)
+                    masks[p] ^= bit
+                    eliminated[p] |= bit
+                    progress = True
+                    for u in CELL_UNITS[p]:
+                        stamps[u] = clock
+                    for offset, position in LOCATION_SLOTS[p]:
+                        locations[offset + digit] ^= position
+                    if not masks[p] and not solutions[p]:
+                        self.mark_error(p)
+        return progress
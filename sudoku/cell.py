@@ -1,5 +1,12 @@
 import logging
 from typing import cast
+from sudoku.bitmask import DIGIT_MASK, MASK_SETS
+from sudoku.board import (
+    BoardState,
+    FLAG_ERROR,
+    FLAG_NEW_SOLUTION,
+    FLAG_SPECULATIVE,
+)
 from sudoku.cellnetwork import CellNetwork
 from sudoku.defines import (
     CellValType,
@@ -20,44 +27,47 @@ class Cell(GenericStructure):
     * Possible values given the other solved states
     * Cell ID
     * Pointer to the next cell in the row, column and nineSquare
+    The state itself is held in a BoardState shared by all the cells of a board, the cell is a view of its own
+    index in that board. A cell created without a board gets a private single cell board.
     Methods:
     init() - takes an integer 0-9 or None. Copies to the initial and solved state
     run_rule(rule) - Takes these
     *"""
 
+    __slots__ = ("id", "network", "_board", "_index")
+
     def __init__(
-        self, id: int, network: CellNetwork, initial: CellValType = None
+        self,
+        id: int,
+        network: CellNetwork,
+        initial: CellValType = None,
+        board: BoardState | None = None,
     ) -> None:
-        # TODO can't we just call intialize and get rid of all this stuff?
-        self._check_cell_param_is_legal(initial)
         self.id: int = id
+        self._check_cell_param_is_legal(initial)
         self.network = network
         self.network.home_node(self)
-        self._solved_value: CellValType = None
-        self._new_solution: bool = False
-        self._speculative_solution: bool = False
-        self._error: bool = False
-        self._potentials: set[int] = set(SUD_RANGE)
-        self._eliminated = set()
-        self.initialize(initial)
+        if board is None:
+            self._board = BoardState(1)
+            self._index = 0
+        else:
+            self._board = board
+            self._index = id
+        # The cells of a new board are blank already
+        if initial is not None or not self._board.blank(self._index):
+            self.initialize(initial)
 
     def initialize(self, val: CellValType) -> None:
         """cell can be initialized to a digit 1 - 9 or to None"""
         logger.debug("Init is called for Cell %d", self.id)
         self._check_cell_param_is_legal(val)
-        self._speculative_solution = False
-        self._error = False
-        if val is not None:
-            self._initial_value = val
-            # Can't  just call set_solution here as network isn't guarenteed to be set up yet
-            self._solved_value = val
-            self.clear_potentials()
-        else:
-            self._initial_value = None
-            self._solved_value = None
-            self._potentials = set(SUD_RANGE)
-        self.clear_eliminated()
-        self.clear_new_solution()
+        # Clears the speculative, error and new solution flags
+        _ = self._board.initialize_cell(self._index, val or 0)
+
+    @property
+    def board(self) -> BoardState:
+        """The board holding this cell's state, the cell is at index id if it is a full board"""
+        return self._board
 
     def _check_cell_param_is_legal(self, val: CellValType) -> None:
         """cell can be initialized to a digit 1 - 9 or to None
@@ -71,66 +81,82 @@ class Cell(GenericStructure):
 
     @property
     def solved(self) -> bool:
-        return self.solution is not None
+        return self._board.solutions[self._index] != 0
 
     @property
     def in_error(self) -> bool:
-        return self._error
+        return bool(self._board.flags[self._index] & FLAG_ERROR)
+
+    def mark_error(self) -> None:
+        self._board.mark_error(self._index)
 
     @property
     def new_solution(self) -> bool:
-        return self._new_solution
+        return bool(self._board.flags[self._index] & FLAG_NEW_SOLUTION)
 
     @property
     def speculative_solution(self) -> bool:
-        return self._speculative_solution
+        return bool(self._board.flags[self._index] & FLAG_SPECULATIVE)
 
     @speculative_solution.setter
     def speculative_solution(self, val):
-        self._speculative_solution = True
+        self._board.changed.add(self._index)
+        self._board.flags[self._index] |= FLAG_SPECULATIVE
         self.set_solution(val)
 
     def clear_new_solution(self) -> None:
-        self._new_solution = False
+        self._board.changed.add(self._index)
+        self._board.flags[self._index] &= ~FLAG_NEW_SOLUTION
 
     @property
     def solution(self) -> CellValType:
-        return self._solved_value
+        return self._board.solutions[self._index] or None
 
     @property
     def initial(self) -> CellValType:
-        return self._initial_value
+        return self._board.initials[self._index] or None
+
+    @property
+    def mask(self) -> int:
+        """Potentials as a 9-bit candidate mask, bit d-1 set for digit d"""
+        return self._board.masks[self._index]
+
+    @property
+    def eliminated_mask(self) -> int:
+        return self._board.eliminated[self._index]
 
     @property
-    def potentials(self) -> set[int]:
-        return self._potentials
+    def potentials(self) -> frozenset[int]:
+        """Read only set view of the candidate mask"""
+        return MASK_SETS[self._board.masks[self._index]]
 
     @property
-    def eliminated(self) -> set[int]:
-        return self._eliminated
+    def eliminated(self) -> frozenset[int]:
+        return MASK_SETS[self._board.eliminated[self._index]]
 
     def clear_potentials(self) -> None:
-        self._potentials.clear()
+        self._board.set_mask(self._index, 0)
 
     def clear_eliminated(self) -> None:
-        self._eliminated.clear()
+        self._board.changed.add(self._index)
+        self._board.eliminated[self._index] = 0
 
     def add_potential(self, val: int) -> None:
         self._check_cell_param_is_legal(val)
-        self._potentials.add(val)
+        self._board.set_mask(self._index, self.mask | DIGIT_MASK[val])
 
     def remove_potential(self, val: int) -> bool:
         self._check_cell_param_is_legal(val)
-        if val in self._potentials:
-            self._potentials.remove(val)
-            self._eliminated.add(val)
-            return True
-        else:
-            return False
+        return self.remove_mask(DIGIT_MASK[val])
+
+    def remove_mask(self, mask: int) -> bool:
+        """Remove every potential in mask from this cell. Returns True if anything was removed"""
+        return self._board.remove(self._index, mask)
 
     def check_consistency(self) -> bool:
         """Check that current solution state is legal. Used to catch any logic problems early, shouldn't find them
-        if there are no errors"""
+        if there are no errors. This walks the network, on a full board set_solution relies on the board's unit
+        counters instead"""
 
         all_is_good = True
         for direction in CSPACES:
@@ -141,8 +167,8 @@ class Cell(GenericStructure):
                     raise Exception("Cell network is not set up correctly")
                 if cell.solution:
                     if solution_set[cell.solution]:
-                        cell._error = True
-                        solution_set[cell.solution]._error = True
+                        cell.mark_error()
+                        solution_set[cell.solution].mark_error()
                         logger.error(
                             "Found more than one solution for solution %d in in direction %s cell %d",
                             cell.solution,
@@ -160,17 +186,25 @@ class Cell(GenericStructure):
     def set_solution(self, val: int) -> None:
         """Set the solution field. Clear the potentials field. Go through all visible c-spaces and remove solved value from their potentials"""
         self._check_cell_param_is_legal(val)
-        self._solved_value = val
-        self._new_solution = True
-        self.clear_potentials()
-        self.check_consistency()  # TODO if this is done here, can I remove other calls?
-        logger.info("Cell %d: Solution found: %d", self.id, self._solved_value)
+        # The board's unit counters flag any duplicate as the value is placed
+        _ = self._board.place(self._index, val)
+        if not self._board.full_board:
+            # A free standing cell has no unit counters, walk its network instead
+            _ = self.check_consistency()
+        logger.info("Cell %d: Solution found: %d", self.id, val)
 
     def remove_potential_in_cspaces(self, val: int) -> None:
+        """Remove val from the potentials of every cell this cell can see. On a full board this drains the
+        board's propagation queue, which holds this cell's solution"""
+        self._check_cell_param_is_legal(val)
+        if self._board.full_board:
+            _ = self._board.propagate()
+            return
+        mask = DIGIT_MASK[val]
         for direction in CSPACES:
             for cell in self.network.clist[direction]:
                 if not cell.solved:
-                    _ = cell.remove_potential(val)
+                    _ = cell.remove_mask(mask)
                     # If all potentials are gone something is wrong mark the cell in error
-                    if not cell.potentials:
-                        cell._error = True
+                    if not cell.mask:
+                        cell.mark_error()
@@ -1,10 +1,11 @@
 import logging
-from typing import Any
+from typing import Any, Sequence
 from sudoku.generic_structure import GenericStructure
 from sudoku.defines import (
     DirectionType,
     CSPACES,
 )
+from sudoku.topology import CELL_UNITS, NEXT, PEERS
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +14,31 @@ class CellNetwork:
     """A CellNetwork from the perspective of a single cell within that network. That is the network contains a
     cell for a single cell but also the means to traverse the row, column and square for that particular cell
     Built by a network builder class, the cell network gets cell state for an entire sudoku network and provides
-    methods for the network to be traversed"""
+    methods for the network to be traversed.
+    A network can be connected by hand (connect then completed_connection) or, for a cell on a standard board,
+    directly from the static tables in sudoku.topology (connect_topology). A network connected from the tables
+    only keeps the board's cells and units, clist and peers are looked up in the tables the first time they are
+    needed"""
+
+    __slots__ = (
+        "_next",
+        "_connection_complete",
+        "_node_count",
+        "_cells",
+        "_units",
+        "_clist",
+        "_peers",
+        "my_cell",
+    )
 
     def __init__(self):
         self._next: dict[DirectionType, GenericStructure | None] = dict.fromkeys(
             CSPACES
         )
         self._connection_complete = False
+        self._cells: Sequence[Any] | None = None
+        self._clist: dict[DirectionType, Sequence[Any]] | None = None
+        self._peers: tuple[Any, ...] | None = None
 
     def home_node(self, cell: GenericStructure):
         self.my_cell = cell
@@ -28,30 +47,71 @@ class CellNetwork:
         self._next[direction] = cell
 
     def traverse(self, direction: DirectionType) -> GenericStructure:
+        if self._cells is not None:
+            return self._cells[NEXT[direction][self.my_cell.id]]  # type: ignore
         return self._next[direction]  # type: ignore
 
     def completed_connection(self) -> None:
         self._connection_complete = True
         self._generate_convenience_lists()
 
+    def connect_topology(
+        self, cells: Sequence[Any], units: Sequence[tuple[Any, ...]]
+    ) -> None:
+        """Connect a cell of a standard board using the precomputed tables rather than walking pointers.
+        cells is the board's list of cells indexed by id and units the 27 unit tuples of cells, shared between
+        all the cells of the board"""
+        self._cells = cells
+        self._units = units
+        self._clist = self._peers = None
+        self._node_count = len(units[0]) - 1
+        self._connection_complete = True
+
+    @property
+    def clist(self) -> dict[DirectionType, Sequence[Any]]:
+        """The cells of the row, column and square of this cell, by direction"""
+        if self._clist is None:
+            index = self.my_cell.id  # type: ignore
+            self._clist = dict(
+                zip(CSPACES, (self._units[u] for u in CELL_UNITS[index]))
+            )
+        return self._clist
+
+    @property
+    def peers(self) -> tuple[Any, ...]:
+        """The other cells which share a unit with this cell"""
+        if self._peers is None:
+            cells = self._cells
+            assert cells is not None
+            self._peers = tuple(cells[i] for i in PEERS[self.my_cell.id])  # type: ignore
+        return self._peers
+
     def _generate_convenience_lists(self):
-        self.clist: dict[DirectionType, list[Any]] = {}
-        self.olist: dict[DirectionType, list[Any]] = {}
+        self._clist = {}
+        peers = []
         for direction in CSPACES:
-            self.clist[direction] = []
-            self.clist[direction].append(self.my_cell)
+            self._clist[direction] = [self.my_cell]
         for direction in CSPACES:
-            self.olist[direction] = []
             count = 0
             cell = self.traverse(direction)
             while cell != self.my_cell and cell is not None:
-                self.clist[direction].append(cell)
-                self.olist[direction].append(cell)
+                self._clist[direction].append(cell)  # type: ignore
+                if cell not in peers:
+                    peers.append(cell)
                 cell = cell.network.traverse(direction)
                 count += 1
                 if count > 100:
                     raise Exception("Cell network is not set up correctly")
             self._node_count = count
+        self._peers = tuple(peers)
+
+    @property
+    def olist(self) -> dict[DirectionType, list[Any]]:
+        """The cells in each direction other than this one"""
+        return {
+            direction: [c for c in self.clist[direction] if c is not self.my_cell]
+            for direction in CSPACES
+        }
 
     @property
     def connection_ok(self) -> bool:
@@ -63,6 +123,6 @@ class CellNetwork:
         # Iterate over row, col and square.
         total_result = self._connection_complete
         for direction in CSPACES:
-            ok = len(self.clist[direction]) == (self._node_count - 1)
+            ok = len(self.clist[direction]) == (self._node_count + 1)
             total_result = total_result and ok
         return total_result
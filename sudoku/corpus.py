@@ -0,0 +1,226 @@
+"""Binary puzzle corpus with random access through mmap.
+
+A puzzle is packed as 81 nibbles, one digit (0 for a blank) per cell in reading order, two cells a byte with the
+first in the high nibble. That is 41 bytes a puzzle, half the size of the text strings. The file is a fixed size
+header followed by the records back to back, so puzzle i is at HEADER_SIZE + i * RECORD_SIZE. Names are optional,
+when written they follow the records as an index of count + 1 offsets (8 bytes each, little endian) into a blob of
+the UTF-8 names, name i is blob[offset[i]:offset[i + 1]].
+
+Header, little endian:
+* magic b"SUDC"
+* format version (2 bytes)
+* record size (2 bytes)
+* puzzle count (8 bytes)
+* offset of the name index, 0 if there are no names (8 bytes)
+* reserved (8 bytes)
+
+Corpus maps the file read only. record gives the packed bytes of a puzzle as a memoryview of the map, nothing is
+copied, indexing or slicing unpacks them to the usual 81 character strings. write_corpus streams puzzles to a new
+file without holding them all in memory, under a temporary name until it is complete. The text format of sudoku.yaml and the batch CLI converts with
+text_to_corpus and corpus_to_text.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterable, Iterator, TextIO, overload
+from sudoku.defines import SUD_CELL_COUNT
+
+MAGIC = b"SUDC"
+VERSION = 1
+RECORD_SIZE = (SUD_CELL_COUNT + 1) // 2
+HEADER = struct.Struct("<4sHHQQ8x")
+HEADER_SIZE = HEADER.size
+
+# The two digits of each byte, None for a byte with a nibble above 9, and the byte of each pair of digits
+_PAIRS = tuple(
+    f"{b >> 4}{b & 0xF}" if b >> 4 <= 9 and b & 0xF <= 9 else None for b in range(256)
+)
+_PACKED = {f"{hi}{lo}": hi << 4 | lo for hi in range(10) for lo in range(10)} | {
+    f"{hi}": hi << 4 for hi in range(10)
+}
+
+
+def pack(puzzle: str) -> bytes:
+    """Pack an 81 character puzzle string, 0 or . for a blank. Raises ValueError if it isn't one"""
+    if len(puzzle) != SUD_CELL_COUNT:
+        raise ValueError
+    digits = puzzle.replace(".", "0")
+    try:
+        return bytes([_PACKED[digits[i : i + 2]] for i in range(0, SUD_CELL_COUNT, 2)])
+    except KeyError:
+        raise ValueError from None
+
+
+def unpack(record: bytes | memoryview) -> str:
+    """The puzzle string of a packed record. Raises ValueError for a nibble which isn't a digit"""
+    try:
+        return "".join([_PAIRS[b] for b in record])[:SUD_CELL_COUNT]
+    except TypeError:
+        raise ValueError("corrupt puzzle record") from None
+
+
+def write_corpus(
+    path: str, puzzles: Iterable[str], names: Iterable[str] | None = None
+) -> int:
+    """Write puzzles to a new corpus file, with their names if given (one for each puzzle). Returns the number of
+    puzzles written"""
+    if names is None:
+        return _write(path, ((None, p) for p in puzzles), False)
+    return _write(path, zip(names, puzzles, strict=True), True)
+
+
+def _write(path: str, entries: Iterable[tuple[str | None, str]], named: bool) -> int:
+    """Stream (name, puzzle) pairs to a corpus file. The records go straight to the file, the names are kept until
+    the records are done. The file is written under a temporary name and only replaces path once it is complete
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    file = open(temp_path, "xb")
+    try:
+        with file:
+            count = _write_file(file, entries, named)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return count
+
+
+def _write_file(
+    file: BinaryIO, entries: Iterable[tuple[str | None, str]], named: bool
+) -> int:
+    count = 0
+    offsets = array("Q", [0])
+    blob = bytearray()
+    file.write(bytes(HEADER_SIZE))
+    for name, puzzle in entries:
+        file.write(pack(puzzle))
+        count += 1
+        if named:
+            blob += str(name).encode("utf-8")
+            offsets.append(len(blob))
+    index_offset = 0
+    if named:
+        index_offset = HEADER_SIZE + count * RECORD_SIZE
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        file.write(offsets.tobytes())
+        file.write(blob)
+    file.seek(0)
+    file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, count, index_offset))
+    return count
+
+
+class Corpus:
+    """Read only view of a corpus file. Use as a context manager or call close"""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if len(self._map) < HEADER_SIZE:
+            self.close()
+            raise ValueError(f"{path} is not a puzzle corpus")
+        magic, version, record_size, count, index_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{path} is not a puzzle corpus")
+        # The records, and the names when there are any, have to fit in the file as the header describes them. The
+        # name index follows the records and its last offset is the size of the name blob
+        size = len(self._map)
+        records_end = HEADER_SIZE + count * RECORD_SIZE
+        names_offset = index_offset + (count + 1) * 8
+        valid = records_end <= size
+        if valid and index_offset:
+            valid = index_offset == records_end and names_offset <= size
+            if valid:
+                (blob_size,) = struct.unpack_from("<Q", self._map, names_offset - 8)
+                valid = names_offset + blob_size <= size
+        if not valid:
+            self.close()
+            raise ValueError(f"{path} is truncated or has a bad header")
+        self.count = count
+        self._index_offset = index_offset
+        self._names_offset = names_offset
+
+    def close(self) -> None:
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def has_names(self) -> bool:
+        return self._index_offset != 0
+
+    def record(self, index: int) -> memoryview:
+        """The packed bytes of puzzle index, a view of the file. Views have to be released before the corpus is
+        closed"""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError
+        start = HEADER_SIZE + index * RECORD_SIZE
+        return self._view[start : start + RECORD_SIZE]
+
+    def records(self, start: int = 0, stop: int | None = None) -> memoryview:
+        """The packed bytes of puzzles start to stop, one view of the file"""
+        start, stop, _ = slice(start, stop).indices(self.count)
+        stop = max(start, stop)
+        return self._view[
+            HEADER_SIZE + start * RECORD_SIZE : HEADER_SIZE + stop * RECORD_SIZE
+        ]
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [unpack(self.record(i)) for i in range(*index.indices(self.count))]
+        return unpack(self.record(index))
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.count):
+            yield unpack(self.record(i))
+
+    def name(self, index: int) -> str:
+        """Name of puzzle index, its number if the corpus has no names"""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError
+        if not self.has_names:
+            return str(index)
+        start, end = struct.unpack_from(
+            "<QQ", self._map, self._index_offset + index * 8
+        )
+        return bytes(
+            self._view[self._names_offset + start : self._names_offset + end]
+        ).decode("utf-8")
+
+
+def text_to_corpus(lines: Iterable[str], path: str) -> int:
+    """Convert puzzle text lines, as read by the batch CLI, to a corpus file with names. Returns the number of
+    puzzles. Raises ValueError on a line which isn't a puzzle"""
+    # Imported here, the batch module pulls in the whole solver
+    from sudoku.batch import read_puzzles
+
+    return _write(path, read_puzzles(lines), True)
+
+
+def corpus_to_text(corpus: Corpus, out: TextIO) -> None:
+    """Write a corpus in the sudoku.yaml format, one name: "puzzle" line each"""
+    for i in range(len(corpus)):
+        out.write(f'{corpus.name(i)}: "{corpus[i]}"\n')
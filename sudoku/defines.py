@@ -12,3 +12,4 @@ SUD_SPACE_SIZE = 9
 SUD_VAL_START = 1
 SUD_VAL_END = SUD_SPACE_SIZE
 SUD_RANGE = range(SUD_VAL_START, SUD_SPACE_SIZE + SUD_VAL_START)
+SUD_CELL_COUNT = SUD_SPACE_SIZE * SUD_SPACE_SIZE
@@ -0,0 +1,255 @@
+"""Complete solver using Knuth's Algorithm X on dancing links.
+
+A sudoku is an exact cover problem. Each choice of a digit for a cell is a row covering 4 of the 324 constraint
+columns: the cell is filled, and the digit is placed once in the cell's row, column and square. A solution is a
+set of rows that covers every column exactly once. The matrix is built once as circular doubly linked lists held in
+flat int lists (node 0 is the root, nodes 1-324 the column headers, then 4 nodes per row). Covering a column
+unlinks it and every row which hits it, uncovering relinks them in reverse order, so the search backtracks without
+copying anything. The column with the fewest rows left is branched on first.
+
+The givens are selected before the search and every link is restored afterwards, so one DancingLinks can solve
+any number of puzzles. This is the reference oracle for the logical rules: it always finds every solution, or
+proves there are none, however hard the puzzle.
+"""
+
+from typing import Iterator
+from sudoku.defines import SUD_CELL_COUNT, SUD_SPACE_SIZE
+from sudoku.topology import CELL_UNITS, ROW_MAJOR, UNIT_COUNT
+
+# Column numbers: one per cell, then one per unit and digit
+COLUMN_COUNT = SUD_CELL_COUNT + UNIT_COUNT * SUD_SPACE_SIZE
+# Row number pos * 9 + digit - 1 places digit at pos, the position in the 81 character puzzle string
+ROW_COUNT = SUD_CELL_COUNT * SUD_SPACE_SIZE
+
+
+def row_columns(row: int) -> tuple[int, ...]:
+    """The 4 constraint columns covered by a row"""
+    pos, d = divmod(row, SUD_SPACE_SIZE)
+    cell = ROW_MAJOR[pos]
+    return (cell,) + tuple(
+        SUD_CELL_COUNT + u * SUD_SPACE_SIZE + d for u in CELL_UNITS[cell]
+    )
+
+
+def parse_givens(puzzle: str) -> list[int]:
+    """Rows selected by the givens of an 81 character puzzle string, 0 (or .) for a blank. Raises ValueError if the
+    string is not a puzzle"""
+    if len(puzzle) != SUD_CELL_COUNT:
+        raise ValueError
+    givens = []
+    for pos, val in enumerate(puzzle):
+        if val not in "0.":
+            if not "1" <= val <= "9":
+                raise ValueError
+            givens.append(pos * SUD_SPACE_SIZE + int(val) - 1)
+    return givens
+
+
+class DancingLinks:
+    """The sudoku exact cover matrix as dancing links"""
+
+    __slots__ = ("left", "right", "up", "down", "column", "row", "size")
+
+    def __init__(self) -> None:
+        headers = COLUMN_COUNT + 1
+        # Headers are nodes 1 - COLUMN_COUNT, linked in a ring through the root
+        self.left = [i - 1 for i in range(headers)]
+        self.left[0] = COLUMN_COUNT
+        self.right = [i + 1 for i in range(headers)]
+        self.right[COLUMN_COUNT] = 0
+        self.up = list(range(headers))
+        self.down = list(range(headers))
+        self.column = list(range(headers))
+        self.row = [-1] * headers
+        self.size = [0] * headers
+        for row in range(ROW_COUNT):
+            first = len(self.column)
+            columns = row_columns(row)
+            for k, col in enumerate(columns):
+                c = col + 1
+                node = first + k
+                # Append the node at the bottom of its column and into the row's ring
+                self.up.append(self.up[c])
+                self.down.append(c)
+                self.down[self.up[c]] = node
+                self.up[c] = node
+                self.left.append(first + (k - 1) % len(columns))
+                self.right.append(first + (k + 1) % len(columns))
+                self.column.append(c)
+                self.row.append(row)
+                self.size[c] += 1
+
+    def _cover(self, c: int) -> None:
+        left, right, up, down, column, size = (
+            self.left,
+            self.right,
+            self.up,
+            self.down,
+            self.column,
+            self.size,
+        )
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, c: int) -> None:
+        left, right, up, down, column, size = (
+            self.left,
+            self.right,
+            self.up,
+            self.down,
+            self.column,
+            self.size,
+        )
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def _select(self, node: int) -> None:
+        """Cover the other columns of the row holding node, its own column is already covered"""
+        j = self.right[node]
+        while j != node:
+            self._cover(self.column[j])
+            j = self.right[j]
+
+    def _deselect(self, node: int) -> None:
+        j = self.left[node]
+        while j != node:
+            self._uncover(self.column[j])
+            j = self.left[j]
+
+    def _choose(self) -> int:
+        """The column with the fewest rows left"""
+        right, size = self.right, self.size
+        best = 0
+        best_size = ROW_COUNT + 1
+        c = right[0]
+        while c:
+            if size[c] < best_size:
+                best, best_size = c, size[c]
+                if best_size <= 1:
+                    break
+            c = right[c]
+        return best
+
+    def _search(self, chosen: list[int]) -> Iterator[list[int]]:
+        """Yield the rows of each solution on top of the rows already chosen. The links are back as they started
+        once the generator finishes or is closed"""
+        right, down, column = self.right, self.down, self.column
+        # Row nodes chosen by the search, one per level
+        stack: list[int] = []
+        try:
+            while True:
+                if not right[0]:
+                    yield chosen + [self.row[node] for node in stack]
+                    backtrack = True
+                else:
+                    c = self._choose()
+                    backtrack = not self.size[c]
+                    if not backtrack:
+                        self._cover(c)
+                        stack.append(down[c])
+                        self._select(down[c])
+                if backtrack:
+                    # Move the deepest level on to its next row, dropping the levels with no rows left
+                    while stack:
+                        node = stack.pop()
+                        self._deselect(node)
+                        c = column[node]
+                        node = down[node]
+                        if node != c:
+                            stack.append(node)
+                            self._select(node)
+                            break
+                        self._uncover(c)
+                    else:
+                        return
+        finally:
+            while stack:
+                node = stack.pop()
+                self._deselect(node)
+                self._uncover(column[node])
+
+    def iter_solutions(self, puzzle: str) -> Iterator[str]:
+        """Yield every solution of an 81 character puzzle string as a string in the same format. Givens which
+        contradict each other have no solutions. Raises ValueError if puzzle is not a puzzle string
+        """
+        givens = parse_givens(puzzle)
+        covered: list[int] = []
+        search = self._search(givens)
+        try:
+            for row in givens:
+                columns = [col + 1 for col in row_columns(row)]
+                if any(self.right[self.left[c]] != c for c in columns):
+                    # Another given already covers one of the constraints
+                    return
+                for c in columns:
+                    self._cover(c)
+                    covered.append(c)
+            for rows in search:
+                out = ["0"] * SUD_CELL_COUNT
+                for row in rows:
+                    pos, d = divmod(row, SUD_SPACE_SIZE)
+                    out[pos] = str(d + 1)
+                yield "".join(out)
+        finally:
+            # The search has to unwind before the givens are
+            search.close()
+            for c in reversed(covered):
+                self._uncover(c)
+
+    def solutions(self, puzzle: str, limit: int | None = None) -> list[str]:
+        """The solutions of puzzle, at most limit of them if limit is given"""
+        found = []
+        if limit is not None and limit <= 0:
+            return found
+        solutions = self.iter_solutions(puzzle)
+        try:
+            for solution in solutions:
+                found.append(solution)
+                if len(found) == limit:
+                    break
+        finally:
+            solutions.close()
+        return found
+
+    def solve(self, puzzle: str) -> str | None:
+        """The first solution of puzzle, None if it has none"""
+        found = self.solutions(puzzle, 1)
+        return found[0] if found else None
+
+
+_shared: DancingLinks | None = None
+
+
+def _links() -> DancingLinks:
+    global _shared
+    if _shared is None:
+        _shared = DancingLinks()
+    return _shared
+
+
+def solve(puzzle: str) -> str | None:
+    """Solve an 81 character puzzle string with a DancingLinks shared by the process, see DancingLinks.solve"""
+    return _links().solve(puzzle)
+
+
+def solutions(puzzle: str, limit: int | None = None) -> list[str]:
+    """Solutions of an 81 character puzzle string, see DancingLinks.solutions"""
+    return _links().solutions(puzzle, limit)
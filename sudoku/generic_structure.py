@@ -3,3 +3,5 @@ from abc import ABC
 
 class GenericStructure(ABC):
     """A base class for cells, ninesquares or other builing block structures"""
+
+    __slots__ = ()
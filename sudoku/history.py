@@ -1,24 +1,56 @@
+from array import array
 from sudoku.ruleengine import SudokuRule
 
+BACKENDS = ("checkpoint", "journal")
+
 
 class History:
+    """Queue of the rules applied to the puzzle with a cursor (curr_ptr) for stepping back and forth.
+    Two backends are available for getting the board to a point in the history:
+    * checkpoint - board snapshots are taken after every checkpoint_interval'th rule, so that moving to a point
+      in the history only needs a restore and a replay of the few rules since the checkpoint. Snapshots are kept
+      up to max_checkpoint_bytes, past that the checkpoints furthest from the one being saved are evicted.
+    * journal - the changes each rule made to the board are kept as a delta (see BoardState.delta_since) which
+      is undone stepping back and re-applied stepping forward without running any rule logic.
+    Any edit of the queue drops the checkpoints or deltas it invalidates."""
+
     START = -1
     RULE = 0
     PAYLOAD = 1
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        checkpoint_interval: int = 4,
+        max_checkpoint_bytes: int = 1 << 20,
+        backend: str = "checkpoint",
+    ) -> None:
+        if checkpoint_interval < 1 or backend not in BACKENDS:
+            raise ValueError
+        self.backend = backend
+        # history index -> (board delta of that rule, progress of the rule), None once it is out of date
+        self._deltas: list[tuple[array, bool] | None] = []
+        self.checkpoint_interval = checkpoint_interval
+        self.max_checkpoint_bytes = max_checkpoint_bytes
         self.rule_queue: list[SudokuRule] = []
+        # history index -> (board snapshot after that rule ran, progress of the rule)
+        self._checkpoints: dict[int, tuple[bytes, bool]] = {}
+        self._checkpoint_bytes = 0
         self.tail_ptr = self.START
         self.curr_ptr = self.START
 
     def push_rule(self, rule: SudokuRule) -> None:
         self.rule_queue.insert(self.curr_ptr + 1, rule)
+        self._deltas.insert(self.curr_ptr + 1, None)
         self.tail_ptr += 1
         self.curr_ptr += 1
+        # Anything recorded from here on was recorded without the new rule
+        self._drop_checkpoints(self.curr_ptr)
 
     def clear(self) -> None:
         self.rule_queue = []
+        self._deltas = []
         self.tail_ptr = self.curr_ptr = self.START
+        self._drop_checkpoints(0)
 
     def back(self) -> None:
         if self.curr_ptr != self.START:
@@ -31,13 +63,17 @@ class History:
     def delete_current(self) -> None:
         if not self.at_beginning:
             self.rule_queue.pop(self.curr_ptr)
+            self._deltas.pop(self.curr_ptr)
             self.tail_ptr -= 1
+            self._drop_checkpoints(self.curr_ptr)
 
     def prune(self) -> None:
         next = self.curr_ptr + 1
         while next <= self.tail_ptr:
             self.rule_queue.pop(next)
+            self._deltas.pop(next)
             self.tail_ptr -= 1
+        self._drop_checkpoints(next)
 
     def print_out(self) -> list[str]:
         out = []
@@ -53,3 +89,68 @@ class History:
     @property
     def at_beginning(self) -> bool:
         return self.curr_ptr == self.START
+
+    @property
+    def journaling(self) -> bool:
+        return self.backend == "journal"
+
+    ## Journal
+    def save_delta(self, index: int, delta: array, progress: bool) -> None:
+        """Save the board delta recorded while the rule at index ran"""
+        self._deltas[index] = (delta, progress)
+
+    def delta(self, index: int) -> tuple[array, bool] | None:
+        """The delta and progress of the rule at index, None if it has not been recorded since the last edit"""
+        return self._deltas[index]
+
+    @property
+    def journal_bytes(self) -> int:
+        """Memory used by the recorded deltas"""
+        return sum(d[0].itemsize * len(d[0]) for d in self._deltas if d is not None)
+
+    ## Checkpoints
+    def should_checkpoint(self, index: int) -> bool:
+        return (
+            not self.journaling
+            and index % self.checkpoint_interval == self.checkpoint_interval - 1
+            and index not in self._checkpoints
+        )
+
+    def save_checkpoint(self, index: int, snapshot: bytes, progress: bool) -> None:
+        """Save the board snapshot taken after the rule at index ran"""
+        if len(snapshot) > self.max_checkpoint_bytes:
+            return
+        self._drop_checkpoint(index)
+        self._checkpoints[index] = (snapshot, progress)
+        self._checkpoint_bytes += len(snapshot)
+        # Evict the checkpoints furthest away from the new one until back under the memory cap
+        while self._checkpoint_bytes > self.max_checkpoint_bytes:
+            furthest = max(self._checkpoints, key=lambda i: abs(i - index))
+            self._drop_checkpoint(furthest)
+
+    def nearest_checkpoint(self, index: int) -> tuple[int, tuple[bytes, bool] | None]:
+        """Return the closest checkpoint at or before index and its history index. If there is none the index
+        is START and the checkpoint None"""
+        best = self.START
+        for i in self._checkpoints:
+            if best < i <= index:
+                best = i
+        return best, self._checkpoints.get(best)
+
+    @property
+    def checkpoint_bytes(self) -> int:
+        """Memory used by the checkpoint snapshots"""
+        return self._checkpoint_bytes
+
+    def _drop_checkpoint(self, index: int) -> None:
+        checkpoint = self._checkpoints.pop(index, None)
+        if checkpoint is not None:
+            self._checkpoint_bytes -= len(checkpoint[0])
+
+    def _drop_checkpoints(self, first: int) -> None:
+        """Drop every checkpoint from history index first onwards"""
+        for i in [i for i in self._checkpoints if i >= first]:
+            self._drop_checkpoint(i)
+        # The deltas are recorded against the state before them, so everything after an edit is out of date
+        for i in range(first, len(self._deltas)):
+            self._deltas[i] = None
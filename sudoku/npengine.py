@@ -0,0 +1,211 @@
+"""Logical rules applied to a whole batch of puzzles at once with NumPy.
+
+A batch of N puzzles is held as two (N, 81) arrays indexed by cell id (see sudoku.topology): the candidate mask of
+every cell (see sudoku.bitmask, 0 once solved) and its solution (0 while unsolved). Each rule of sudoku.rules is
+written as a handful of array operations over the whole batch, gathering cells through index arrays built from the
+topology tables:
+* elimination - OR the solutions of the 20 peers of every cell and clear them from its candidates
+* elimination to one - cells with a single candidate are solved
+* single possible location - a digit seen once in a unit solves the cell holding it. The digits seen exactly once
+  come from a running OR of the unit's masks, the same trick the cell rule uses
+* aligned potentials - the ORs of the 54 subline overlaps give every square and line remainder. A digit of an
+  overlap missing from the rest of its square is cleared from the rest of its line and vice versa
+
+step applies all of them to the puzzles still active. Puzzles that are solved, show a contradiction or reach a
+fixpoint (nothing changed) drop out of the batch, so the later steps only pay for the puzzles still moving.
+
+NumPy is an optional dependency, only this module needs it.
+"""
+
+from typing import Sequence
+import numpy as np
+from sudoku.defines import SUD_CELL_COUNT, SUD_SPACE_SIZE
+from sudoku.topology import (
+    CELL_UNIT_POS,
+    CELL_UNITS,
+    PEERS,
+    ROW_MAJOR,
+    SUBLINE_NEIGHBOURS,
+    SUBLINES,
+    UNITS,
+)
+
+# Puzzle status
+ACTIVE = 0
+SOLVED = 1
+STUCK = 2
+ERROR = 3
+
+ALL_DIGITS = (1 << SUD_SPACE_SIZE) - 1
+PEER_INDEX = np.array(PEERS, dtype=np.intp)
+UNIT_INDEX = np.array(UNITS, dtype=np.intp)
+CELL_UNIT_INDEX = np.array(CELL_UNITS, dtype=np.intp)
+CELL_UNIT_POS_INDEX = np.array(CELL_UNIT_POS, dtype=np.intp)
+READING_ORDER = np.array(ROW_MAJOR, dtype=np.intp)
+OVERLAP_INDEX = np.array([overlap for overlap, _, _ in SUBLINES], dtype=np.intp)
+SQUARE_NEIGHBOUR_INDEX = np.array([sq for sq, _ in SUBLINE_NEIGHBOURS], dtype=np.intp)
+LINE_NEIGHBOUR_INDEX = np.array([ln for _, ln in SUBLINE_NEIGHBOURS], dtype=np.intp)
+# The 4 sublines whose line remainder (square remainder) holds each cell
+LINE_REST_INDEX = np.array(
+    [
+        [s for s, (_, _, rest) in enumerate(SUBLINES) if i in rest]
+        for i in range(SUD_CELL_COUNT)
+    ],
+    dtype=np.intp,
+)
+SQUARE_REST_INDEX = np.array(
+    [
+        [s for s, (_, rest, _) in enumerate(SUBLINES) if i in rest]
+        for i in range(SUD_CELL_COUNT)
+    ],
+    dtype=np.intp,
+)
+# Number of bits in, and the digit of a single bit, each mask
+POPCOUNT = np.array(
+    [bin(m).count("1") for m in range(1 << SUD_SPACE_SIZE)], dtype=np.uint8
+)
+MASK_DIGIT = np.array(
+    [m.bit_length() if m & (m - 1) == 0 else 0 for m in range(1 << SUD_SPACE_SIZE)],
+    dtype=np.uint8,
+)
+
+
+def _or_reduce(array: np.ndarray) -> np.ndarray:
+    return np.bitwise_or.reduce(array, axis=-1)
+
+
+def _seen_once(array: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Masks of the bits set in exactly one and in more than one entry along the last axis"""
+    ones = np.zeros(array.shape[:-1], dtype=np.uint16)
+    twos = np.zeros_like(ones)
+    for k in range(array.shape[-1]):
+        twos |= ones & array[..., k]
+        ones |= array[..., k]
+    return ones & ~twos, twos
+
+
+def solution_bits(values: np.ndarray) -> np.ndarray:
+    """The solutions as masks, 0 for an unsolved cell"""
+    return np.where(
+        values > 0, np.left_shift(1, values.astype(np.int32) - 1), 0
+    ).astype(np.uint16)
+
+
+def eliminate(masks: np.ndarray, values: np.ndarray) -> None:
+    """Clear the solutions of its peers from every cell"""
+    masks &= ~_or_reduce(solution_bits(values)[:, PEER_INDEX])
+
+
+def elimination_to_one(masks: np.ndarray, values: np.ndarray) -> None:
+    """Solve the cells left with a single candidate"""
+    single = (POPCOUNT[masks] == 1) & (values == 0)
+    values[single] = MASK_DIGIT[masks[single]]
+    masks[single] = 0
+
+
+def single_possible_location(masks: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Solve the cells holding a digit seen once in one of their units. Returns the puzzles where a cell would be
+    two digits at once"""
+    unit_masks = masks[:, UNIT_INDEX]
+    once, _ = _seen_once(unit_masks)
+    hidden = unit_masks & once[:, :, np.newaxis]
+    cell_hidden = _or_reduce(hidden[:, CELL_UNIT_INDEX, CELL_UNIT_POS_INDEX])
+    counts = POPCOUNT[cell_hidden]
+    single = counts == 1
+    values[single] = MASK_DIGIT[cell_hidden[single]]
+    masks[single] = 0
+    return (counts > 1).any(axis=1)
+
+
+def aligned_potentials(masks: np.ndarray) -> None:
+    """Clear the digits confined to a subline overlap from the rest of its line and square"""
+    overlap = _or_reduce(masks[:, OVERLAP_INDEX])
+    square_rest = _or_reduce(overlap[:, SQUARE_NEIGHBOUR_INDEX])
+    line_rest = _or_reduce(overlap[:, LINE_NEIGHBOUR_INDEX])
+    from_line = overlap & ~square_rest
+    from_square = overlap & ~line_rest
+    masks &= ~(
+        _or_reduce(from_line[:, LINE_REST_INDEX])
+        | _or_reduce(from_square[:, SQUARE_REST_INDEX])
+    )
+
+
+def contradiction(masks: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """The puzzles with an unsolved cell without candidates, a digit solved twice in a unit or a digit with no
+    place left in a unit"""
+    empty = ((masks == 0) & (values == 0)).any(axis=1)
+    bits = solution_bits(values)[:, UNIT_INDEX]
+    _, twice = _seen_once(bits)
+    duplicate = (twice != 0).any(axis=1)
+    missing = ((_or_reduce(bits) | _or_reduce(masks[:, UNIT_INDEX])) != ALL_DIGITS).any(
+        axis=1
+    )
+    return empty | duplicate | missing
+
+
+class BatchEngine:
+    """A batch of puzzles and the status of each one"""
+
+    def __init__(self, puzzles: Sequence[str]) -> None:
+        """puzzles are 81 character strings with 0 or . for a blank. Raises ValueError for anything else"""
+        data = "".join(puzzles).replace(".", "0").encode("ascii")
+        if any(len(p) != SUD_CELL_COUNT for p in puzzles):
+            raise ValueError
+        digits = np.frombuffer(data, dtype=np.uint8).reshape(
+            len(puzzles), SUD_CELL_COUNT
+        ) - ord("0")
+        if (digits > SUD_SPACE_SIZE).any():
+            raise ValueError
+        self.values = np.empty_like(digits)
+        self.values[:, READING_ORDER] = digits
+        self.masks = np.where(self.values == 0, ALL_DIGITS, 0).astype(np.uint16)
+        self.status = np.full(len(puzzles), ACTIVE, dtype=np.uint8)
+        self.steps = 0
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def step(self) -> int:
+        """Apply every rule once to the active puzzles and update their status. Returns the number still active"""
+        active = np.flatnonzero(self.status == ACTIVE)
+        if not len(active):
+            return 0
+        masks, values = self.masks[active], self.values[active]
+        before_masks, before_values = masks.copy(), values.copy()
+        eliminate(masks, values)
+        elimination_to_one(masks, values)
+        eliminate(masks, values)
+        clash = single_possible_location(masks, values)
+        eliminate(masks, values)
+        aligned_potentials(masks)
+        error = clash | contradiction(masks, values)
+        solved = ~error & (values != 0).all(axis=1)
+        unchanged = (masks == before_masks).all(axis=1) & (values == before_values).all(
+            axis=1
+        )
+        status = np.where(
+            error, ERROR, np.where(solved, SOLVED, np.where(unchanged, STUCK, ACTIVE))
+        )
+        self.masks[active] = masks
+        self.values[active] = values
+        self.status[active] = status
+        self.steps += 1
+        return int((status == ACTIVE).sum())
+
+    def run(self, max_steps: int | None = None) -> np.ndarray:
+        """Step until no puzzle is active, or for max_steps. Returns the status of each puzzle"""
+        while self.step() and (max_steps is None or self.steps < max_steps):
+            pass
+        return self.status
+
+    def to_strings(self) -> list[str]:
+        """The solutions of each puzzle as 81 character strings, 0 for unsolved"""
+        data = (
+            (self.values[:, READING_ORDER] + ord("0"))
+            .astype(np.uint8)
+            .tobytes()
+            .decode("ascii")
+        )
+        return [
+            data[i : i + SUD_CELL_COUNT] for i in range(0, len(data), SUD_CELL_COUNT)
+        ]
@@ -0,0 +1,134 @@
+"""Speculative search spread over a pool of processes.
+
+The top levels of the search tree are expanded in the calling process: starting from the puzzle after the logical
+rules, the unsolved cell with the fewest potentials is given each of its values, level by level, until there are
+enough branches to keep every worker busy. Each branch is an ordinary puzzle string, the puzzle plus the solutions
+found so far and the speculative values, so it is cheap to send to a worker. The workers run Sudoku.search on the
+branches and the first one to find a solution sets a shared event, which stops the searches still running and
+leaves the queued branches to be cancelled.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+from multiprocessing.synchronize import Event
+from sudoku.bitmask import MASK_DIGITS
+from sudoku.sudoku import Sudoku
+from sudoku.topology import ROW_MAJOR
+
+logger = logging.getLogger(__name__)
+
+# Branches queued per worker, more branches balance the load better but each one costs a puzzle setup
+BRANCHES_PER_WORKER = 4
+
+# Per worker process state, set up by _init_worker
+_worker_sudoku: Sudoku | None = None
+_worker_stop: Event | None = None
+
+
+class ParallelReport:
+    """Outcome of parallel_search
+    * solution - the solved puzzle in sudoku format, None if there is none
+    * branches - number of branches handed out to the workers
+    * nodes - search nodes of the branches which ran to the end or were stopped, see SearchReport.nodes
+    * cancelled - number of branches which never started because a solution was already found
+    """
+
+    def __init__(self) -> None:
+        self.solution: str | None = None
+        self.branches = 0
+        self.nodes = 0
+        self.cancelled = 0
+
+
+def _init_worker(stop: Event) -> None:
+    global _worker_sudoku, _worker_stop
+    _worker_sudoku = Sudoku()
+    _worker_stop = stop
+
+
+def _search_branch(branch: str) -> tuple[str | None, int]:
+    """Search one branch in a worker. Returns the solution, if found, and the number of search nodes"""
+    sudoku, stop = _worker_sudoku, _worker_stop
+    assert sudoku is not None and stop is not None
+    if stop.is_set():
+        return None, 0
+    sudoku.load_sud(branch)
+    sudoku.initialize()
+    report = sudoku.search(record_history=False, stop=stop.is_set)
+    if report.solved:
+        stop.set()
+        return sudoku.to_sud(), report.nodes
+    return None, report.nodes
+
+
+def split(
+    puzzle: str, count: int, sudoku: Sudoku | None = None
+) -> tuple[list[str], str | None]:
+    """Expand the top of the search tree of puzzle until there are at least count branches, or nothing left to
+    expand. Returns the branches and the solution if the logic alone solved one of them on the way
+    """
+    if sudoku is None:
+        sudoku = Sudoku()
+    frontier = [puzzle]
+    while len(frontier) < count:
+        expanded = []
+        for branch in frontier:
+            sudoku.load_sud(branch)
+            sudoku.initialize()
+            _ = sudoku.solve_logically(record_history=False)
+            if sudoku.solved and not sudoku.in_error:
+                return [], sudoku.to_sud()
+            cell = None if sudoku.in_error else sudoku.fewest_potentials()
+            if cell is None:
+                # A dead end, drop the branch
+                continue
+            state = list(sudoku.to_sud())
+            pos = ROW_MAJOR.index(cell)
+            for val in MASK_DIGITS[sudoku.cells[cell].mask]:
+                state[pos] = str(val)
+                expanded.append("".join(state))
+        if not expanded:
+            return [], None
+        frontier = expanded
+    return frontier, None
+
+
+def parallel_search(puzzle: str, workers: int | None = None) -> ParallelReport:
+    """Solve puzzle, given in sudoku format, by searching branches of it on workers processes (the number of CPUs
+    by default). The first solution found wins, the rest of the search is stopped"""
+    workers = workers or os.cpu_count() or 1
+    report = ParallelReport()
+    branches, report.solution = split(puzzle, workers * BRANCHES_PER_WORKER)
+    report.branches = len(branches)
+    if report.solution is not None or not branches:
+        return report
+    stop = multiprocessing.Event()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(stop,)
+    ) as executor:
+        pending = {executor.submit(_search_branch, b) for b in branches}
+        while pending and report.solution is None:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                solution, nodes = future.result()
+                report.nodes += nodes
+                if solution is not None and report.solution is None:
+                    report.solution = solution
+        stop.set()
+        for future in pending:
+            if future.cancel():
+                report.cancelled += 1
+            else:
+                report.nodes += future.result()[1]
+    logger.info(
+        "Parallel search of %d branches found %s after %d nodes, %d cancelled",
+        report.branches,
+        report.solution,
+        report.nodes,
+        report.cancelled,
+    )
+    return report
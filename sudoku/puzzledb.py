@@ -0,0 +1,143 @@
+"""Puzzle library stored in SQLite, a drop in for PuzzleList.
+
+PuzzleList keeps every puzzle of the YAML file in a dict and rewrites and re-reads the whole file on every change.
+Here the puzzles live in an SQLite table with the name as a unique (indexed) key, so looking up, adding or deleting
+a puzzle only touches that puzzle. Each add or delete is its own transaction and is on disk when it returns, update
+and read have nothing left to do. puzzles is a read only mapping over the table, nothing is loaded at startup and
+iterating over the names streams them in the order they were added.
+
+migrate_yaml moves a PuzzleList YAML file into a database once. The file's text, comments and all, is kept in the
+archive table of the database since the comments have no place in the puzzle table.
+"""
+
+import sqlite3
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterable, Iterator
+from sudoku.bitboard import count_solutions
+from sudoku.puzzleio import PuzzleList
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    puzzle TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive (
+    source TEXT PRIMARY KEY,
+    content TEXT NOT NULL
+);
+"""
+
+
+class PuzzleTable(Mapping):
+    """Read only mapping of puzzle name to puzzle string, straight from the database"""
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._db = connection
+
+    def __getitem__(self, name: str) -> str:
+        row = self._db.execute(
+            "SELECT puzzle FROM puzzles WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row[0]
+
+    def __contains__(self, name: object) -> bool:
+        return (
+            self._db.execute("SELECT 1 FROM puzzles WHERE name = ?", (name,)).fetchone()
+            is not None
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        for (name,) in self._db.execute("SELECT name FROM puzzles ORDER BY id"):
+            yield name
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM puzzles").fetchone()[0]
+
+
+class SqlitePuzzleList:
+    """The named puzzles of an SQLite database, with the PuzzleList interface. With validate, add only accepts
+    puzzles with exactly one solution"""
+
+    def __init__(self, puzzle_file, validate: bool = False) -> None:
+        self.puzzle_file = puzzle_file
+        self.validate = validate
+        self._db = sqlite3.connect(puzzle_file)
+        self._db.executescript(_SCHEMA)
+        self.puzzles = PuzzleTable(self._db)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def delete(self, puzzle: str):
+        with self._db:
+            deleted = self._db.execute(
+                "DELETE FROM puzzles WHERE name = ?", (puzzle,)
+            ).rowcount
+        if not deleted:
+            raise KeyError(puzzle)
+
+    def add(self, puzzle: str, puzzle_str: str):
+        # Ignore an attempt to add a new puzzle with the same name
+        if puzzle in self.puzzles:
+            return
+        if self.validate and count_solutions(puzzle_str) != 1:
+            raise ValueError(f"Puzzle {puzzle} does not have a unique solution")
+        with self._db:
+            self._db.execute(
+                "INSERT INTO puzzles (name, puzzle) VALUES (?, ?)", (puzzle, puzzle_str)
+            )
+
+    def add_many(self, puzzles: Iterable[tuple[str, str]]) -> int:
+        """Add (name, puzzle) pairs in one transaction, skipping names already present. Returns the number added.
+        Puzzles are not validated"""
+        with self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO puzzles (name, puzzle) VALUES (?, ?)", puzzles
+            )
+            return self._db.total_changes - before
+
+    def read(self):
+        """Nothing to do, puzzles are read from the database as they are needed"""
+
+    def write(self, puzzle_file: str):
+        """Export the puzzles to a YAML file in the PuzzleList format"""
+        with open(puzzle_file, "w") as file:
+            for name, puzzle in self._db.execute(
+                "SELECT name, puzzle FROM puzzles ORDER BY id"
+            ):
+                file.write(f'{name}: "{puzzle}"\n')
+
+    def update(self):
+        """Nothing to do, every add and delete is committed as it is made"""
+
+    def archive(self, source: str) -> str | None:
+        """The archived text of a migrated YAML file, None if there is none"""
+        row = self._db.execute(
+            "SELECT content FROM archive WHERE source = ?", (source,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+
+def migrate_yaml(yaml_file, puzzle_file, validate: bool = False) -> SqlitePuzzleList:
+    """Open the database puzzle_file, first moving the puzzles of the PuzzleList yaml_file into it if that hasn't
+    been done yet. The YAML file itself is left alone, its text is archived in the database under its file name
+    """
+    puzzles = SqlitePuzzleList(puzzle_file, validate)
+    source = Path(yaml_file).name
+    if puzzles.archive(source) is None:
+        text = Path(yaml_file).read_text()
+        yaml_puzzles = PuzzleList(yaml_file).puzzles or {}
+        with puzzles._db:
+            puzzles._db.executemany(
+                "INSERT OR IGNORE INTO puzzles (name, puzzle) VALUES (?, ?)",
+                ((str(name), str(p)) for name, p in yaml_puzzles.items()),
+            )
+            puzzles._db.execute(
+                "INSERT INTO archive (source, content) VALUES (?, ?)", (source, text)
+            )
+    return puzzles
@@ -1,12 +1,18 @@
+from typing import Iterator
 from ruamel.yaml import YAML
-from sudoku.defines import PuzzleFormat
+from sudoku.bitboard import count_solutions
+from sudoku.defines import PuzzleFormat, SUD_CELL_COUNT, SUD_SPACE_SIZE
+from sudoku.topology import CELL_UNITS, ROW_MAJOR
 
 
 class PuzzleList:
-    def __init__(self, puzzle_file):
+    """The named puzzles of a YAML file. With validate, add only accepts puzzles with exactly one solution"""
+
+    def __init__(self, puzzle_file, validate: bool = False):
         self.yaml = YAML()
         self.puzzles = {}
         self.puzzle_file = puzzle_file
+        self.validate = validate
         self.read()
 
     def delete(self, puzzle: str):
@@ -16,6 +22,8 @@ class PuzzleList:
         # Ignore an attempt to add a new puzzle with the same name
         if puzzle in self.puzzles:
             return
+        if self.validate and count_solutions(puzzle_str) != 1:
+            raise ValueError(f"Puzzle {puzzle} does not have a unique solution")
         self.puzzles[puzzle] = puzzle_str
 
     def read(self):
@@ -47,3 +55,96 @@ def convert_to_ns_format(puzzle: str) -> PuzzleFormat:
     for i in ns_list:
         ns_tup.append(tuple(i))
     return tuple(ns_tup)
+
+
+# Bulk parsing works on bytes. Every cell character maps to its digit character, . and _ are blanks, and the grid
+# separators of .sdk style files are dropped
+_CELL_TABLE = bytes.maketrans(b"._", b"00")
+_SEPARATORS = b"|+-"
+# What may follow the 81 cells of a one line puzzle, before a rating say
+_TRAILER_START = frozenset(b" \t,;")
+# Value of each digit byte
+_CELL_VALUE: dict[int, int | None] = {ord("0"): None} | {
+    ord(str(d)): d for d in range(1, SUD_SPACE_SIZE + 1)
+}
+# Reading positions of the cells of each NineSquare, in NineSquare order
+_NS_POSITIONS = tuple(
+    tuple(ROW_MAJOR.index(n * SUD_SPACE_SIZE + i) for i in range(SUD_SPACE_SIZE))
+    for n in range(SUD_SPACE_SIZE)
+)
+# Unit numbers of each reading position
+_POS_UNITS = tuple(CELL_UNITS[cell] for cell in ROW_MAJOR)
+
+
+def _check_givens(cells: bytes) -> bool:
+    """True unless two givens share a digit in a row, column or square"""
+    seen = set()
+    for pos, c in enumerate(cells):
+        if c != 48:
+            for unit in _POS_UNITS[pos]:
+                key = unit << 4 | c - 48
+                if key in seen:
+                    return False
+                seen.add(key)
+    return True
+
+
+def parse_puzzles(data: bytes | memoryview) -> Iterator[bytes]:
+    """Parse a block of puzzle text, yielding each puzzle as 81 ASCII digits in reading order with 0 for a blank.
+    Understood, and freely mixed:
+    * one puzzle a line, 0 or . for a blank, followed by anything after a space, tab, comma or semicolon (a rating,
+      say)
+    * grids of 9 lines, cells optionally separated by spaces and |, with divider lines of - + and | (the .sdk layout)
+    * blank lines and # comments
+    Raises ValueError, with the line number, for a line that is neither or for givens repeating a digit in a unit
+    """
+    buffer = data if isinstance(data, bytes) else bytes(data)
+    grid = b""
+    grid_start = 0
+    for number, line in enumerate(buffer.split(b"\n"), 1):
+        line = line.split(b"#", 1)[0].strip()
+        if not line:
+            continue
+        head = line[:SUD_CELL_COUNT]
+        if (
+            len(head) == SUD_CELL_COUNT
+            and head.translate(_CELL_TABLE).isdigit()
+            and (len(line) == SUD_CELL_COUNT or line[SUD_CELL_COUNT] in _TRAILER_START)
+        ):
+            if grid:
+                raise ValueError(f"line {grid_start}: incomplete grid")
+            cells = head.translate(_CELL_TABLE)
+        else:
+            if b"-" in line and not line.translate(None, _SEPARATORS):
+                # A divider line of a grid
+                continue
+            row = line.translate(_CELL_TABLE, _SEPARATORS + b" \t\r")
+            if not row.isdigit() or len(row) % SUD_SPACE_SIZE:
+                raise ValueError(f"line {number}: not a puzzle")
+            if not grid:
+                grid_start = number
+            grid += row
+            if len(grid) < SUD_CELL_COUNT:
+                continue
+            if len(grid) > SUD_CELL_COUNT:
+                raise ValueError(f"line {grid_start}: grid is too long")
+            cells, grid = grid, b""
+        if not _check_givens(cells):
+            raise ValueError(f"line {number}: givens repeat a digit in a unit")
+        yield cells
+    if grid:
+        raise ValueError(f"line {grid_start}: incomplete grid")
+
+
+def to_ns_format(cells: bytes) -> PuzzleFormat:
+    """The PuzzleFormat of 81 ASCII digits as yielded by parse_puzzles, the same as convert_to_ns_format gives"""
+    value = _CELL_VALUE
+    return tuple(
+        tuple(value[cells[p]] for p in positions) for positions in _NS_POSITIONS
+    )
+
+
+def load_puzzles(data: bytes | memoryview) -> Iterator[PuzzleFormat]:
+    """Parse a block of puzzle text straight to PuzzleFormat, see parse_puzzles"""
+    for cells in parse_puzzles(data):
+        yield to_ns_format(cells)
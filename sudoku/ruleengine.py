@@ -1,18 +1,128 @@
 import logging
+from collections import Counter
+from typing import Any, Sequence
+from sudoku.board import BoardState
 from sudoku.subline import SubLine
 from sudoku.cell import Cell
+from sudoku.defines import CSPACES
 from sudoku.rules import SudokuRule
+from sudoku.topology import CELL_UNITS, SUBLINE_UNITS, UNIT_SWEEP
 
 logger = logging.getLogger(__name__)
 
 
 class RuleEngine:
-    """Takes a rule and runs it on the correct structure, cell, subline, ninesquare etc.
-    rule protocol."""
+    """Takes a rule and runs it on the correct structure, cell, subline, unit etc.
+    rule protocol.
+    A unit is a tuple of the cells in a row, column or square. If the units aren't given they are collected from
+    the constrained spaces of the cells, each unit once.
+    A unit rule run on all units sweeps them in the order a cell rule would have seen them (the row, col and square
+    of each cell in turn) so the results are the same as the per cell rules they replace.
 
-    def __init__(self, cells: list[Cell], sublines: list[SubLine]) -> None:
+    A rule run on all structures skips the structures which are clean for that rule: it last ran on them without
+    progress and nothing they depend on has changed since, so running it again would not find anything either.
+    Given the board, the change stamps of the units a structure covers tell whether it is clean (a cell depends on
+    its row, col and square, a subline on its line and square). Without a board only units can be checked, by
+    comparing their contents. The number of structures analyzed and skipped for each rule are counted in analyzed
+    and skipped."""
+
+    def __init__(
+        self,
+        cells: list[Cell],
+        sublines: list[SubLine],
+        units: Sequence[Sequence[Cell]] | None = None,
+        board: BoardState | None = None,
+    ) -> None:
         self.cells = cells
         self.sublines = sublines
+        self.units = units if units is not None else self._collect_units(cells)
+        self.board = board
+        # A full board has the standard topology, the sweep is fixed. Hand wired networks have to work it out
+        if board is not None and board.full_board:
+            self._unit_sweep: Sequence[int] = UNIT_SWEEP
+        else:
+            self._unit_sweep = self._build_unit_sweep(cells, self.units)
+        self._orders = {
+            "cell": range(len(self.cells)),
+            "subline": range(len(self.sublines)),
+            "unit": self._unit_sweep,
+        }
+        # Board units each structure depends on, by structure type and index
+        self._deps: dict[str, list[Sequence[int]]] = {}
+        if board is not None:
+            self._deps = {
+                "cell": [CELL_UNITS[c.id] for c in cells],
+                "subline": [SUBLINE_UNITS[s.index] for s in sublines],
+                "unit": [(u,) for u in range(len(self.units))],
+            }
+        # rule name -> structure index -> version of the structure when the rule last ran on it without progress
+        self._settled: dict[str, dict[int, Any]] = {}
+        self.analyzed: Counter[str] = Counter()
+        self.skipped: Counter[str] = Counter()
+
+    @staticmethod
+    def _unit_key(unit: Sequence[Cell]) -> frozenset[int]:
+        return frozenset(c.id for c in unit)
+
+    @classmethod
+    def _collect_units(cls, cells: list[Cell]) -> list[Sequence[Cell]]:
+        units: list[Sequence[Cell]] = []
+        seen = set()
+        for cell in cells:
+            for direction in CSPACES:
+                unit = cell.network.clist[direction]
+                key = cls._unit_key(unit)
+                if key not in seen:
+                    seen.add(key)
+                    units.append(unit)
+        return units
+
+    @classmethod
+    def _build_unit_sweep(
+        cls, cells: list[Cell], units: Sequence[Sequence[Cell]]
+    ) -> list[int]:
+        """Indices of the units in the order the cells see them, each cell's row, col and square in turn"""
+        index = {cls._unit_key(unit): i for i, unit in enumerate(units)}
+        sweep = []
+        for cell in cells:
+            for direction in CSPACES:
+                sweep.append(index[cls._unit_key(cell.network.clist[direction])])
+        return sweep
+
+    @staticmethod
+    def _unit_state(unit: Sequence[Cell]) -> tuple[tuple[int, int | None], ...]:
+        return tuple((c.mask, c.solution) for c in unit)
+
+    def _version(self, structure_type: str, index: int, structure: Any) -> Any:
+        """Anything which changes whenever the state a structure depends on changes, None if unknown"""
+        if self.board is None:
+            return self._unit_state(structure) if structure_type == "unit" else None
+        stamps = self.board.unit_stamps
+        return max(stamps[u] for u in self._deps[structure_type][index])
+
+    def _run_all(self, rule: SudokuRule, target_list: Sequence[Any]) -> bool:
+        structure_type = rule.structure_type
+        settled = self._settled.setdefault(rule.name, {})
+        total_result = False
+        analyzed = skipped = 0
+        for i in self._orders[structure_type]:
+            structure = target_list[i]
+            version = self._version(structure_type, i, structure)
+            if version is not None and settled.get(i) == version:
+                skipped += 1
+                continue
+            analyzed += 1
+            if rule.run(structure):
+                total_result = True
+                settled.pop(i, None)
+            else:
+                settled[i] = version
+        self.analyzed[rule.name] += analyzed
+        self.skipped[rule.name] += skipped
+        logger.info(
+            "RuleEngine rule %s analyzed %d skipped %d", rule.name, analyzed, skipped
+        )
+        return total_result
 
     def execute(self, rule: SudokuRule) -> bool:
         logger.info("RuleEngine starting rule %s", rule.name)
@@ -20,10 +130,9 @@ class RuleEngine:
             target_list = self.cells
         elif rule.structure_type == "subline":
             target_list = self.sublines
+        elif rule.structure_type == "unit":
+            target_list = self.units
         if rule.target == "all":
-            total_result = False
-            for structure in target_list:
-                total_result |= rule.run(structure)
-            return total_result
+            return self._run_all(rule, target_list)
         else:
             return rule.run(target_list[rule.target])
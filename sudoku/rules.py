@@ -1,14 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import cast
+from typing import cast, Sequence
 import logging
+from sudoku.bitmask import DIGIT_MASK, MASK_DIGITS, POPCOUNT, SINGLE_DIGIT
 from sudoku.defines import (
     DirectionType,
     SUD_RANGE,
     CSPACES,
 )
 from sudoku.generic_structure import GenericStructure
+from sudoku.topology import (
+    CELL_SUBLINES,
+    CELL_UNIT_POS,
+    CELL_UNITS,
+    SUBLINE_NEIGHBOURS,
+    SUBLINES,
+)
+from sudoku.board import BoardState
 from sudoku.subline import SubLine
-import itertools
+from sudoku.subsets import locked_subsets
 from sudoku.cell import Cell
 
 logger = logging.getLogger(__name__)
@@ -46,18 +55,31 @@ class SudokuRule(ABC):
     ) -> set[int]:
         """Traverse the space looking for mode number of occurences in potentials i.e. singles, pairs, triplets etc
         Returns a set of those potentials"""
+        return set(MASK_DIGITS[self._gather_multiples_mask(cell, mode, direction)])
+
+    def _gather_multiples_mask(
+        self, cell: Cell, mode: int, direction: DirectionType
+    ) -> int:
+        """Mask version of _gather_multiples"""
+        board = cell.board
+        if board.full_board:
+            # Read the counts straight from the board's location index
+            unit = CELL_UNITS[cell.id][CSPACES.index(direction)]
+            pot_mask = 0
+            for num in SUD_RANGE:
+                if POPCOUNT[board.digit_locations(unit, num)] == mode:
+                    pot_mask |= DIGIT_MASK[num]
+            return pot_mask
         pot_count = dict.fromkeys(SUD_RANGE, 0)
-        pot_list = set()
-        cells = cell.network.clist[direction]
-        for c in cells:
-            for num in c.potentials:
+        for c in cell.network.clist[direction]:
+            for num in MASK_DIGITS[c.mask]:
                 pot_count[num] += 1
-        # Analyze potential_count statistics to see if there are any unique (just one) potential
-        # If so then build a list of those numbers
+        # Analyze potential_count statistics to see if there are any with exactly mode occurrences
+        pot_mask = 0
         for num, count in pot_count.items():
             if count == mode:
-                pot_list.add(num)
-        return pot_list
+                pot_mask |= DIGIT_MASK[num]
+        return pot_mask
 
 
 class CellRule(SudokuRule):
@@ -72,6 +94,13 @@ class SublineRule(SudokuRule):
     _structure_type = "subline"
 
 
+class UnitRule(SudokuRule):
+    """A protocol for rules which analyze a whole row, column or square at a time. The structure is the tuple of
+    cells in the unit, so a full pass visits each of the 27 units exactly once"""
+
+    _structure_type = "unit"
+
+
 class EliminationToOneRule(CellRule):
     _name = "elimination_to_one"
 
@@ -80,10 +109,9 @@ class EliminationToOneRule(CellRule):
         the solution"""
         cell = cast(Cell, structure)
         progress = False
-        if len(cell.potentials) == 1:
+        mysolution = SINGLE_DIGIT[cell.mask]
+        if mysolution:
             # Solved
-            # TODO using internal _, should this just be made available or need a helper function?
-            (mysolution,) = cell.potentials
             cell.set_solution(mysolution)
             cell.remove_potential_in_cspaces(mysolution)
             progress = True
@@ -109,26 +137,22 @@ class EliminationRule(CellRule):
     _name = "elimination_visible"
 
     def run(self, structure: GenericStructure) -> bool:
-        """Eliminate all solutions seen in constrained spaces. This step is run for every rule, but in this case
-        just run the elimination step"""
+        """Eliminate all solutions seen in constrained spaces. The board normally does this incrementally as each
+        solution is placed, this is the full pass over every peer for an explicit request
+        """
         home_cell = cast(Cell, structure)
         if home_cell.solved:
             return False
-        potential_starting_len = len(home_cell.potentials)
-        for direction in CSPACES:
-            node = cast(Cell, home_cell.network.traverse(direction))
-            while node != home_cell:
-                if node.solution:
-                    _ = home_cell.remove_potential(node.solution)
-                node = cast(Cell, node.network.traverse(direction))
-            # If all potentials are gone something is wrong mark the cell in error
-            if not home_cell.potentials:
-                home_cell._error = True
-        if len(home_cell._potentials) < potential_starting_len:
+        seen = 0
+        for node in home_cell.network.peers:
+            seen |= DIGIT_MASK[node.solution or 0]
+        progress = home_cell.remove_mask(seen)
+        # If all potentials are gone something is wrong mark the cell in error
+        if not home_cell.mask:
+            home_cell.mark_error()
+        if progress:
             logger.debug("Cell %d made progress on potentials", home_cell.id)
-            return True
-        else:
-            return False
+        return progress
 
 
 class SinglePossibleLocationRule(CellRule):
@@ -139,19 +163,35 @@ class SinglePossibleLocationRule(CellRule):
         for a given constrained space, then that is the solution"""
 
         cell = cast(Cell, structure)
+        board = cell.board
         # Iterate over row, col and square.
-        for direction in CSPACES:
-            singles_set = self._gather_multiples(cell, 1, direction)
-            # Now see if any of our cell potentials is in the list, if so set it as the solution
-            for num in cell.potentials:
-                if num in singles_set:
-                    cell.set_solution(num)
-                    cell.remove_potential_in_cspaces(num)
-                    return True  # short circuit if solution found
+        for d, direction in enumerate(CSPACES):
+            if board.full_board:
+                # A potential is single in the space if the location index has only this cell for it
+                unit = CELL_UNITS[cell.id][d]
+                position = 1 << CELL_UNIT_POS[cell.id][d]
+                singles = 0
+                for num in MASK_DIGITS[cell.mask]:
+                    if board.digit_locations(unit, num) == position:
+                        singles |= DIGIT_MASK[num]
+            else:
+                # Potentials seen exactly once in the space
+                seen_once = 0
+                multiples = 0
+                for c in cell.network.clist[direction]:
+                    multiples |= seen_once & c.mask
+                    seen_once |= c.mask
+                singles = seen_once & ~multiples & cell.mask
+            # If any of our cell potentials is a single, the lowest one is the solution
+            if singles:
+                num = MASK_DIGITS[singles][0]
+                cell.set_solution(num)
+                cell.remove_potential_in_cspaces(num)
+                return True  # short circuit if solution found
         return False
 
 
-class FilledCellsRule(CellRule):
+class FilledCellsRule(UnitRule):
     _name = "filled_cells"
 
     def run(self, structure: GenericStructure) -> bool:
@@ -160,34 +200,10 @@ class FilledCellsRule(CellRule):
         This is a generalization of the single possible location rule. Note that this does not require that the
         potentials show up in all n cells. So a triple, a double and a single that are constrained to 3 cells would
         meet the criteria"""
-        cell = cast(Cell, structure)
-        total_return = False
-
-        for direction in CSPACES:
-            # Use the convenience list and add own cell for a complete network
-            cells = cell.network.clist[direction]
-            potentials_set = set()
-            for cell in cells:
-                potentials_set |= cell.potentials
-            for n in range(1, len(potentials_set) + 1):
-                for combo in itertools.combinations(potentials_set, n):
-                    combo = set(combo)
-                    matching_cells = []
-                    for cell in cells:
-                        if cell.potentials & combo:
-                            matching_cells.append(cell)
-                    if len(matching_cells) == n:
-                        # We have found a set of matched pairs, now go through each cell and eliminate any potential
-                        # that is not part of the matched pair combination
-                        for cell in matching_cells:
-                            to_remove = cell.potentials - combo
-                            for p in to_remove:
-                                _ = cell.remove_potential(p)
-                                total_return |= True
-        return total_return
-
-
-class FilledPotentialsRule(CellRule):
+        return _apply_locked_subsets(cast(Sequence[Cell], structure), True)
+
+
+class FilledPotentialsRule(UnitRule):
     _name = "filled_potentials"
 
     def run(self, structure: GenericStructure) -> bool:
@@ -196,65 +212,80 @@ class FilledPotentialsRule(CellRule):
         n potential values then you can assume those potential values will not be seen in the other cells. This is
         the general case of the eliminate to one rule as that rule is just the 1 value in 1 cell case.
         """
-        cell = cast(Cell, structure)
-        total_return = False
-
-        for direction in CSPACES:
-            cells = cell.network.clist[direction]
-            # Build a list of unsolved cells
-            unsolved_cells = []
-            for c in cells:
-                if not c.solved:
-                    unsolved_cells.append(c)
-            for n in range(1, len(unsolved_cells) + 1):
-                for combo in itertools.combinations(unsolved_cells, n):
-                    potentials_set = set()
-                    for mycell in combo:
-                        potentials_set |= mycell.potentials
-                    if len(potentials_set) == len(combo):
-                        # We have found a set of matched pairs, now go through each cell not in the combo and
-                        # eliminate any potential from the combo
-                        for mycell in unsolved_cells:
-                            if mycell in combo:
-                                continue
-                            for p in potentials_set:
-                                progress = mycell.remove_potential(p)
-                                total_return |= progress
-        return total_return
+        return _apply_locked_subsets(cast(Sequence[Cell], structure), False)
+
+
+def _apply_locked_subsets(cells: Sequence[Cell], hidden_first: bool) -> bool:
+    """Run the subset search of sudoku.subsets over the unsolved cells of a unit and remove whatever it
+    eliminated"""
+    unsolved = [c for c in cells if not c.solved]
+    masks = tuple(c.mask for c in unsolved)
+    reduced = locked_subsets(masks, hidden_first)
+    progress = False
+    for c, old, new in zip(unsolved, masks, reduced):
+        if old != new:
+            progress |= c.remove_mask(old & ~new)
+    return progress
 
 
 class AlignedPotentialsRule(SublineRule):
     _name = "aligned_potentials"
 
+    def __init__(self, target: int | str):
+        super().__init__(target)
+        # OR of the overlap masks of each subline, None until needed. The square and line non overlaps of a subline
+        # are the overlaps of its neighbours, so these are all a pass needs. Valid while the board's change clock
+        # has only moved for the rule's own eliminations
+        self._segments: list[int | None] = [None] * len(SUBLINES)
+        self._board: BoardState | None = None
+        self._clock = -1
+
+    def _segment(self, masks: Sequence[int], index: int) -> int:
+        segment = self._segments[index]
+        if segment is None:
+            a, b, c = SUBLINES[index][0]
+            segment = self._segments[index] = masks[a] | masks[b] | masks[c]
+        return segment
+
+    def _remove(self, board: BoardState, cells: Sequence[int], mask: int) -> bool:
+        progress = False
+        for i in cells:
+            if board.remove(i, mask):
+                progress = True
+                for j in CELL_SUBLINES[i]:
+                    self._segments[j] = None
+        return progress
+
     def run(self, structure: GenericStructure) -> bool:
         """Utilizes the subline structures. Looks for occurences of a potential in ..."""
         subline = cast(SubLine, structure)
+        board = subline.board
+        if board is not self._board or board.clock != self._clock:
+            self._board = board
+            self._segments = [None] * len(SUBLINES)
+        masks = board.masks
         progress = False
-        # Gather up all of the possible potentials
-        pot_count = dict.fromkeys(SUD_RANGE, 0)
-        for cell in subline.overlap:
-            if cell.solved:
-                continue
-            for num in cell.potentials:
-                pot_count[num] += 1
-        # See which have more than 1
-        for p, cnt in pot_count.items():
-            if cnt > 1:
-                # Check if potential exists in non-overlap square
-                found_in_non_ov_square = False
-                for cell in subline.square_non_over_lap:
-                    if p in cell.potentials:
-                        found_in_non_ov_square = True
-                if not found_in_non_ov_square:
-                    # This is the aligned case
-                    for cell in subline.line_non_over_lap:
-                        progress = progress | cell.remove_potential(p)
-                else:
-                    found_in_non_ov_line = False
-                    for cell in subline.line_non_over_lap:
-                        if p in cell.potentials:
-                            found_in_non_ov_line = True
-                    if not found_in_non_ov_line:
-                        for cell in subline.square_non_over_lap:
-                            progress = progress | cell.remove_potential(p)
+        # Gather up the potentials which appear in more than one overlap cell
+        a, b, c = (masks[i] for i in subline.overlap_ids)
+        multiples = (a & b) | (a & c) | (b & c)
+        if multiples:
+            square_peers, line_peers = SUBLINE_NEIGHBOURS[subline.index]
+            square_mask = 0
+            for j in square_peers:
+                square_mask |= self._segment(masks, j)
+            line_mask = 0
+            for j in line_peers:
+                line_mask |= self._segment(masks, j)
+            # Potentials not found in the non-overlap square are aligned, remove them from the rest of the line
+            aligned = multiples & ~square_mask
+            if aligned:
+                progress |= self._remove(board, subline.line_non_over_lap_ids, aligned)
+            # Potentials not found in the rest of the line must lie in the overlap, remove them from the rest of
+            # the square
+            aligned = multiples & square_mask & ~line_mask
+            if aligned:
+                progress |= self._remove(
+                    board, subline.square_non_over_lap_ids, aligned
+                )
+        self._clock = board.clock
         return progress
@@ -0,0 +1,114 @@
+"""Bitmask search for locked subsets within a unit, the work behind the filled cells and filled potentials rules.
+
+A unit is described by the candidate masks of its unsolved cells. n cells whose candidates together hold only n
+digits are a naked subset, those digits can be removed from the other cells. n digits which together appear in
+only n cells are a hidden subset, every other digit can be removed from those cells. Transposing the masks into a
+location mask per digit (bit i set if cell i holds the digit) turns a hidden subset into a naked subset of the
+transposed rows, so both searches share one routine.
+
+With m unsolved cells holding m digits, a naked subset of n cells is the same elimination as the hidden subset of
+the other m - n digits and vice versa. Subsets of more than m/2 cells (or digits) are therefore found as their
+smaller complement on the other side, so no search ever looks past size m/2. The subsets of each size are
+enumerated from precomputed index tables, nothing is built per combination.
+
+The result only depends on the masks, and the same unit signatures come up again and again across passes,
+history replays and puzzles. locked_subsets is memoized in a bounded LRU cache, locked_subsets.cache_info() gives
+the hit and miss statistics and locked_subsets.cache_clear() empties it.
+"""
+
+import functools
+import itertools
+from typing import Sequence
+from sudoku.bitmask import DIGIT_MASK, MASK_DIGITS, POPCOUNT
+from sudoku.defines import SUD_SPACE_SIZE
+
+# Number of unit signatures kept by the locked_subsets cache
+SUBSET_CACHE_SIZE = 1 << 14
+
+# SUBSETS[size][n] holds the n item subsets of size items as tuples of indices, in itertools.combinations order
+SUBSETS: tuple[tuple[tuple[tuple[int, ...], ...], ...], ...] = tuple(
+    tuple(tuple(itertools.combinations(range(size), n)) for n in range(size + 1))
+    for size in range(SUD_SPACE_SIZE + 1)
+)
+
+
+def transpose(rows: Sequence[int], digits: Sequence[int]) -> list[int]:
+    """Turn the candidate masks of the cells into a location mask for each of digits"""
+    locations = []
+    for d in digits:
+        bit = DIGIT_MASK[d]
+        loc = 0
+        for i, mask in enumerate(rows):
+            if mask & bit:
+                loc |= 1 << i
+        locations.append(loc)
+    return locations
+
+
+def untranspose(
+    locations: Sequence[int], digits: Sequence[int], size: int
+) -> list[int]:
+    """Turn the location mask of each of digits back into the candidate masks of size cells"""
+    rows = [0] * size
+    for d, loc in zip(digits, locations):
+        bit = DIGIT_MASK[d]
+        for i in range(size):
+            if loc >> i & 1:
+                rows[i] |= bit
+    return rows
+
+
+def eliminate_naked(rows: list[int], n: int) -> bool | None:
+    """Search rows for every subset of n rows holding only n bits between them and clear those bits from the
+    other rows. rows is updated in place as subsets are found, so later subsets see the earlier eliminations.
+    Returns True if anything was cleared or None if the rows are contradictory, n rows with fewer than n bits
+    """
+    changed = False
+    size = len(rows)
+    for subset in SUBSETS[size][n]:
+        union = 0
+        for i in subset:
+            union |= rows[i]
+        count = POPCOUNT[union]
+        if count < n:
+            return None
+        if count == n:
+            for i in range(size):
+                if rows[i] & union and i not in subset:
+                    rows[i] &= ~union
+                    changed = True
+    return changed
+
+
+@functools.lru_cache(maxsize=SUBSET_CACHE_SIZE)
+def locked_subsets(masks: tuple[int, ...], hidden_first: bool) -> tuple[int, ...]:
+    """Apply every naked and hidden subset elimination to the candidate masks of a unit's unsolved cells and return
+    the reduced masks. Subsets are tried smallest first on the preferred side, hidden (digits) or naked (cells),
+    with the larger sizes covered by the complement on the other side. The search stops at the first sign of a
+    contradiction: an empty cell, fewer digits than cells or n cells (digits) sharing fewer than n digits (cells)
+    """
+    rows = list(masks)
+    size = len(rows)
+    union = 0
+    for mask in rows:
+        if not mask:
+            return tuple(rows)
+        union |= mask
+    digits = MASK_DIGITS[union]
+    if len(digits) < size:
+        return tuple(rows)
+    # Without as many digits as cells the complement trick does not hold, so search every size on one side
+    dual = len(digits) == size
+    for n in range(1, len(digits) if hidden_first else size):
+        hidden, search = hidden_first, n
+        if dual and n > size // 2:
+            hidden, search = not hidden, size - n
+        if hidden:
+            locations = transpose(rows, digits)
+            result = eliminate_naked(locations, search)
+            rows = untranspose(locations, digits, size)
+        else:
+            result = eliminate_naked(rows, search)
+        if result is None:
+            break
+    return tuple(rows)
@@ -1,13 +1,67 @@
 import logging
+import time
+from typing import Callable
+from sudoku.bitmask import MASK_DIGITS, POPCOUNT
+from sudoku.board import BoardState
 from sudoku.history import History
 from sudoku.ninesquare import NineSquare
 from sudoku.defines import PuzzleFormat, SUD_SPACE_SIZE
 from sudoku.puzzleio import convert_to_ns_format
 from sudoku.ruleengine import RuleEngine
-from sudoku.rules import EliminationRule, SudokuRule
+from sudoku.rules import (
+    AlignedPotentialsRule,
+    EliminationToOneRule,
+    FilledCellsRule,
+    FilledPotentialsRule,
+    SinglePossibleLocationRule,
+    SpeculativeSolution,
+    SudokuRule,
+)
+from sudoku.topology import ROW_MAJOR, UNITS
 
 logger = logging.getLogger(__name__)
 
+# The logical rules in order of cost, cheapest first. solve_logically always goes back to the cheapest rule once
+# anything makes progress
+LOGIC_RULES: tuple[type[SudokuRule], ...] = (
+    EliminationToOneRule,
+    SinglePossibleLocationRule,
+    AlignedPotentialsRule,
+    FilledPotentialsRule,
+    FilledCellsRule,
+)
+
+
+class SolveReport:
+    """Outcome of Sudoku.solve_logically
+    * steps - number of rule applications which changed the board, one history entry each when recorded
+    * solved, in_error - state of the puzzle when the solver stopped
+    * runs - number of times each rule was run, by rule name
+    * timings - total seconds spent in each rule, by rule name"""
+
+    def __init__(self) -> None:
+        self.steps = 0
+        self.solved = False
+        self.in_error = False
+        self.runs: dict[str, int] = {}
+        self.timings: dict[str, float] = {}
+
+
+class SearchReport:
+    """Outcome of Sudoku.search
+    * nodes - number of boards propagated, the root and one per speculative solution tried
+    * backtracks - number of speculative solutions which led to a contradiction
+    * depth - the most speculative solutions stacked up at once
+    * path - the (cell id, value) speculative solutions leading to the solution
+    * solved - True if a solution was found"""
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.backtracks = 0
+        self.depth = 0
+        self.path: list[tuple[int, int]] = []
+        self.solved = False
+
 
 class Sudoku:
     """Represents the datastructure for a full Sudoku mesh and includes methods
@@ -31,48 +85,38 @@ class Sudoku:
         * Inferred line
     """
 
-    def __init__(self) -> None:
+    def __init__(self, history_backend: str = "checkpoint") -> None:
         self._initial_state = True
         self._last_rule_progressed = False
-        self.history = History()
-        self.ns: list[NineSquare] = [NineSquare(i) for i in range(SUD_SPACE_SIZE)]
+        self.history = History(backend=history_backend)
+        # All of the cell state lives in one flat buffer, the cells are views into it
+        self.board = BoardState()
+        self.ns: list[NineSquare] = [
+            NineSquare(i, self.board) for i in range(SUD_SPACE_SIZE)
+        ]
         self.cells = []
+        self.units = []
         self.sublines = []
         self.puzzle = None
         for n in self.ns:
             for c in n.cells:
                 self.cells.append(c)
-        self._connect_ninesquare_network()
+        self._connect_cell_network()
         for n in self.ns:
             for s in n.sublines:
                 self.sublines.append(s)
-        self.rule_engine: RuleEngine = RuleEngine(self.cells, self.sublines)
-
-    def _connect_ninesquare_network(self):
-        # Connect up the rows
-        for row_start in (0, 3, 6):
-            self.ns[row_start].attach_row(self.ns[row_start + 1])
-            self.ns[row_start + 1].attach_row(self.ns[row_start + 2])
-            self.ns[row_start + 2].attach_row(self.ns[row_start])  # circular
-        # Connect up the columns
-        for col_start in range(3):
-            self.ns[col_start].attach_col(self.ns[col_start + 3])
-            self.ns[col_start + 3].attach_col(self.ns[col_start + 6])
-            self.ns[col_start + 6].attach_col(self.ns[col_start])  # circular
-        # Signal completion of the network to the cells
+        self.rule_engine: RuleEngine = RuleEngine(
+            self.cells, self.sublines, self.units, self.board
+        )
+
+    def _connect_cell_network(self):
+        # The cells are connected straight from the static topology tables. The 27 unit tuples are shared by all
+        # the cells in the unit
+        self.units = [tuple(self.cells[i] for i in unit) for unit in UNITS]
         for c in self.cells:
-            c.network.completed_connection()
-        # Run a quick check of the completed sudoku network from the cell perspective
-        # if it fails it will trigger an exception, so the answer isn't really needed.
-        # TODO this is wrong. it only runs network from 1 cell perspective. Also it means Sudoku has to understand
-        # cell methods??
-        _ = self.ns[0].cell(0, 0).network.connection_ok
+            c.network.connect_topology(self.cells, self.units)
         for n in self.ns:
-            n.create_sublines()
-
-    def _update_all_potentials(self) -> bool:
-        total_result = self.rule_engine.execute(EliminationRule("all"))
-        return total_result
+            n.create_sublines(self.cells)
 
     ## Public API
     def load(self, puzzle: PuzzleFormat):
@@ -83,6 +127,11 @@ class Sudoku:
         """puzzle given in sudoku format i.e. like the yaml file."""
         self.load(convert_to_ns_format(puzzle))
 
+    def to_sud(self) -> str:
+        """The current solutions in sudoku format, the 81 character string load_sud takes with 0 for unsolved"""
+        solutions = self.board.solutions
+        return "".join(str(solutions[i]) for i in ROW_MAJOR)
+
     def initialize(self, history_mode=False) -> None:
         """Used to initialize state of the puzzle first time or to reset it for subsequent puzzles"""
         if not self.puzzle:
@@ -90,6 +139,10 @@ class Sudoku:
         else:
             if not history_mode:
                 self.history.clear()
+            # Start from a blank board so stale solutions can't clash with the new givens. The givens are queued
+            # for propagation as they are loaded. They are pushed out to their peers when the first rule runs so
+            # that the eliminations show up as part of that step
+            self.board.clear()
             for i in range(SUD_SPACE_SIZE):
                 self.ns[i].initialize(self.puzzle[i])
             logger.info("Sudoku Class finished initialization")
@@ -99,46 +152,273 @@ class Sudoku:
         """Wrapper to send the generic rule to each of the NineSquares"""
         logger.info("Sudoku Class starting rule %s", rule)
         self._initial_state = False
-        # Need to clear this out here because want to capture the elimination from both the potential update
-        # and the rule which gets run
-        for c in self.cells:
-            c.clear_eliminated()
-            c.clear_new_solution()
+        # Need to clear this out here because want to capture the elimination from both the propagation and the
+        # rule which gets run
+        before = (
+            self.board.mark() if self.history.journaling and not history_mode else None
+        )
+        self.board.clear_step_marks()
         if not history_mode:
             self.history.push_rule(rule)
-        _ = self._update_all_potentials()  # Do this for all cells before any rule runs
+        # Push out any solutions still queued, i.e. the givens after initialization. Placements made by the rule
+        # are propagated as they happen, the drain after the rule catches any rule that only places a value
+        _ = self.board.propagate()
         total_result = self.rule_engine.execute(rule)
+        _ = self.board.propagate()
         self._last_rule_progressed = total_result
+        if not history_mode:
+            self._record_step(self.history.curr_ptr, before)
         return total_result
 
+    def solve_logically(
+        self,
+        rules: tuple[type[SudokuRule], ...] = LOGIC_RULES,
+        record_history: bool = True,
+    ) -> SolveReport:
+        """Apply the logical rules until the puzzle is solved, in error or none of them makes progress. rules are
+        tried in order and the solver falls back to the first one as soon as any rule progresses, so the
+        expensive rules only run when the cheap ones are stuck. With record_history each rule application that
+        made progress is added to the history so it can be stepped through like rules run by hand
+        """
+        report = SolveReport()
+        # The board as the last recorded step left it. Rules that make no progress still clear the step marks, so
+        # the delta of the next step has to start from here and the board is put back here at the end
+        last = self.board.mark() if record_history else None
+        i = 0
+        while i < len(rules) and not self.solved and not self.in_error:
+            rule = rules[i]("all")
+            # Pushing out queued solutions, the givens after initialize, changes the board even if the rule itself
+            # makes no progress. That run is a step too or replaying the history would give different marks
+            changed = bool(self.board.pending)
+            start = time.perf_counter()
+            progress = self.run_rule(rule, history_mode=True)
+            elapsed = time.perf_counter() - start
+            report.runs[rule.name] = report.runs.get(rule.name, 0) + 1
+            report.timings[rule.name] = report.timings.get(rule.name, 0.0) + elapsed
+            if progress or changed:
+                report.steps += 1
+                if record_history:
+                    self.history.push_rule(rule)
+                    self._record_step(
+                        self.history.curr_ptr, last if self.history.journaling else None
+                    )
+                    last = self.board.mark()
+                i = 0
+            else:
+                i += 1
+        if last is not None and i:
+            self.restore(last)
+        # A full board can still be in error, e.g. a full grid given with clashes
+        report.solved = self.solved and not self.in_error
+        report.in_error = self.in_error
+        logger.info(
+            "Solve finished after %d steps solved %s in error %s",
+            report.steps,
+            report.solved,
+            report.in_error,
+        )
+        return report
+
+    def search(
+        self,
+        rules: tuple[type[SudokuRule], ...] = LOGIC_RULES,
+        record_history: bool = True,
+        max_nodes: int | None = None,
+        stop: Callable[[], bool] | None = None,
+    ) -> SearchReport:
+        """Solve the puzzle by speculation when the logical rules get stuck. Depth first: the unsolved cell with the
+        fewest potentials gets a SpeculativeSolution for each of its potentials in turn, each followed by
+        solve_logically. A board flagged in error, or holding a cell with no potentials left, is a dead end and the
+        search backtracks by restoring a snapshot, history is not involved. The search gives up after max_nodes
+        boards if that is given, or as soon as stop returns True, leaving the board as it was.
+        With record_history the rules along the path to the solution are added to the history, as if the
+        speculative solutions had been picked by hand"""
+        report = SearchReport()
+        start = self.snapshot()
+        # One entry per speculative level: board snapshot before it, the cell, its values and the next one to try
+        stack: list[tuple[bytes, int, tuple[int, ...], int]] = []
+        _ = self.solve_logically(rules, record_history=False)
+        report.nodes = 1
+        while True:
+            branch = None
+            # A full board can still be in error, e.g. a full grid given with clashes
+            if self.solved and not self.in_error:
+                report.solved = True
+                break
+            if not self.in_error:
+                branch = self.fewest_potentials()
+            if branch is not None:
+                cell = self.cells[branch]
+                stack.append((self.snapshot(), branch, MASK_DIGITS[cell.mask], 0))
+                report.depth = max(report.depth, len(stack))
+            else:
+                report.backtracks += 1
+            # Move on to the next value of the deepest level which has any left
+            while stack and stack[-1][3] == len(stack[-1][2]):
+                stack.pop()
+            if not stack or (max_nodes is not None and report.nodes >= max_nodes):
+                break
+            if stop is not None and stop():
+                break
+            snapshot, branch, values, i = stack[-1]
+            stack[-1] = (snapshot, branch, values, i + 1)
+            self.restore(snapshot)
+            _ = self.run_rule(SpeculativeSolution(branch, values[i]), history_mode=True)
+            _ = self.solve_logically(rules, record_history=False)
+            report.nodes += 1
+        report.path = [(branch, values[i - 1]) for _, branch, values, i in stack]
+        logger.info(
+            "Search finished solved %s nodes %d backtracks %d depth %d",
+            report.solved,
+            report.nodes,
+            report.backtracks,
+            report.depth,
+        )
+        if report.solved and not record_history:
+            return report
+        self.restore(start)
+        if report.solved:
+            self._record_search_path(rules, report.path)
+        return report
+
+    def fewest_potentials(self) -> int | None:
+        """Id of the unsolved cell with the fewest potentials, None if a cell has none left"""
+        best = None
+        best_count = SUD_SPACE_SIZE + 1
+        masks, solutions = self.board.masks, self.board.solutions
+        for i in range(len(self.cells)):
+            if not solutions[i]:
+                count = POPCOUNT[masks[i]]
+                if count < best_count:
+                    if not count:
+                        return None
+                    best, best_count = i, count
+        return best
+
+    def _record_search_path(
+        self, rules: tuple[type[SudokuRule], ...], path: list[tuple[int, int]]
+    ) -> None:
+        """Replay the speculative solutions of a search and the logic after each one into the history"""
+        _ = self.solve_logically(rules)
+        for branch, val in path:
+            _ = self.run_rule(SpeculativeSolution(branch, val))
+            _ = self.solve_logically(rules)
+
+    def _record_step(self, index: int, before: bytes | None) -> None:
+        """Record what is needed to get back to the state after the rule at history index: the delta from the
+        board state before the rule when journaling, otherwise a checkpoint if one is due
+        """
+        if before is not None:
+            self.history.save_delta(
+                index, self.board.delta_since(before), self._last_rule_progressed
+            )
+        elif self.history.should_checkpoint(index):
+            self.history.save_checkpoint(
+                index, self.snapshot(), self._last_rule_progressed
+            )
+
+    def snapshot(self) -> bytes:
+        """Copy of the complete cell state of the board, see restore"""
+        return self.board.snapshot()
+
+    def restore(self, snapshot: bytes) -> None:
+        """Return the board to a state saved by snapshot. History is not changed"""
+        self.board.restore(snapshot)
+
     def replay_history(self, direction: str) -> bool:
+        if direction not in ("back", "forward"):
+            raise Exception("Invalid Argument")
+        if self.history.journaling:
+            return self._step_journal(direction)
         if direction == "back":
             self.history.back()
-        elif direction == "forward":
+        else:
             self.history.forward()
+        return self._goto_history(self.history.curr_ptr)
+
+    def _step_journal(self, direction: str) -> bool:
+        """Step one rule back or forward by undoing or redoing its recorded delta. No rule logic is run unless
+        the delta is out of date after an edit of the history, then the rule is run again and re-recorded
+        """
+        history = self.history
+        if direction == "back":
+            if history.at_beginning:
+                return False
+            entry = history.delta(history.curr_ptr)
+            history.back()
+            if entry is None:
+                return self._goto_history(history.curr_ptr)
+            self.board.apply_delta(entry[0])
         else:
-            raise Exception("Invalid Argument")
-        self.initialize(history_mode=True)
-        progress = False
-        i = 0
-        while i <= self.history.curr_ptr:
+            if history.at_end:
+                return self._last_rule_progressed
+            history.forward()
+            entry = history.delta(history.curr_ptr)
+            if entry is None:
+                before = self.board.mark()
+                progress = self.run_rule(
+                    history.rule_queue[history.curr_ptr], history_mode=True
+                )
+                self._record_step(history.curr_ptr, before)
+                return progress
+            self.board.apply_delta(entry[0])
+        return self._set_step_status()
+
+    def _set_step_status(self) -> bool:
+        """Update the status flags after moving to the current history index without running a rule"""
+        history = self.history
+        self._initial_state = history.at_beginning
+        if history.at_beginning:
+            self._last_rule_progressed = False
+        else:
+            entry = history.delta(history.curr_ptr)
+            self._last_rule_progressed = entry is not None and entry[1]
+        return self._last_rule_progressed
+
+    def _goto_history(self, target: int) -> bool:
+        """Put the board into the state it was in after the rule at history index target. Restores the nearest
+        checkpoint and replays the rules after it, or starts from the initial puzzle if there isn't one
+        """
+        start, checkpoint = self.history.nearest_checkpoint(target)
+        if checkpoint is None:
+            self.initialize(history_mode=True)
+            progress = False
+        else:
+            snapshot, progress = checkpoint
+            self.restore(snapshot)
+            self._initial_state = False
+            self._last_rule_progressed = progress
+        for i in range(start + 1, target + 1):
+            before = self.board.mark() if self.history.journaling else None
             progress = self.run_rule(self.history.rule_queue[i], history_mode=True)
-            i += 1
+            self._record_step(i, before)
         return progress
 
     def prune_history_to_end(self) -> None:
         self.history.prune()
 
     def delete_current_history_event(self) -> bool:
-        self.history.delete_current()
-        return self.replay_history("back")
+        history = self.history
+        if not history.journaling:
+            history.delete_current()
+            return self.replay_history("back")
+        # Undo the deleted rule. The deltas after it were recorded on top of it and are now out of date
+        entry = None if history.at_beginning else history.delta(history.curr_ptr)
+        history.delete_current()
+        history.back()
+        if entry is None:
+            return self._goto_history(history.curr_ptr)
+        self.board.apply_delta(entry[0])
+        return self._set_step_status()
 
     @property
     def solved(self) -> bool:
-        all_solved = True
-        for ns in self.ns:
-            all_solved &= ns.solved
-        return all_solved
+        return self.board.solved
+
+    @property
+    def in_error(self) -> bool:
+        """True if any cell is flagged in error"""
+        return bool(self.board.error_cells)
 
     @property
     def last_rule_progressed(self) -> bool:
@@ -0,0 +1,152 @@
+"""Static index tables describing the shape of a 9x9 sudoku board.
+
+Cells are indexed by their id, which follows the NineSquare layout used throughout the package: the nine squares
+are numbered 0-8 left to right, top to bottom and the cells within a square are numbered the same way, so
+cell id = square * 9 + position in square.
+
+The tables are generated once at import time and shared by every board. Everything is a tuple so nothing can
+change them by accident.
+* CELL_ROW, CELL_COL, CELL_SQUARE - row, column and square number of a cell id
+* ROW_MAJOR - cell ids in reading order (the order of the 81 character puzzle strings)
+* UNITS - the 27 units as tuples of cell ids. 0-8 are rows, 9-17 are columns and 18-26 are squares
+* CELL_UNITS - the (row, col, square) unit numbers of each cell, in CSPACES order
+* CELL_UNIT_POS - the position of each cell within each of its (row, col, square) units
+* UNIT_SWEEP - CELL_UNITS flattened, the units in the order the cells see them: each cell's row, col and square
+* NEXT - for each direction the id of the next cell in that unit, wrapping around at the end
+* PEERS - the 20 other cells which share a unit with each cell
+* SUBLINES - the 54 (overlap, square_non_over_lap, line_non_over_lap) triples used by the aligned potentials
+  rule, 6 per square in the order the NineSquare has always created them: 3 columns then 3 rows
+* SUBLINE_UNITS - the (line, square) unit numbers covering the cells of each subline
+* SUBLINE_NEIGHBOURS - for each subline the 2 sublines of the same direction in its square, whose overlaps make
+  up its square_non_over_lap, and the 2 sublines in its line, whose overlaps make up its line_non_over_lap
+* CELL_SUBLINES - the 2 sublines (one row, one col) whose overlap holds each cell
+"""
+
+from sudoku.defines import CSPACES, SUD_CELL_COUNT, SUD_SPACE_SIZE
+
+UNIT_COUNT = 3 * SUD_SPACE_SIZE
+ROW_UNITS = range(0, SUD_SPACE_SIZE)
+COL_UNITS = range(SUD_SPACE_SIZE, 2 * SUD_SPACE_SIZE)
+SQUARE_UNITS = range(2 * SUD_SPACE_SIZE, 3 * SUD_SPACE_SIZE)
+
+
+def cell_id(row: int, col: int) -> int:
+    """Cell id of the cell at a board row and column"""
+    return (row // 3 * 3 + col // 3) * SUD_SPACE_SIZE + row % 3 * 3 + col % 3
+
+
+ROW_MAJOR: tuple[int, ...] = tuple(
+    cell_id(r, c) for r in range(SUD_SPACE_SIZE) for c in range(SUD_SPACE_SIZE)
+)
+CELL_SQUARE: tuple[int, ...] = tuple(i // SUD_SPACE_SIZE for i in range(SUD_CELL_COUNT))
+CELL_ROW: tuple[int, ...] = tuple(
+    CELL_SQUARE[i] // 3 * 3 + i % SUD_SPACE_SIZE // 3 for i in range(SUD_CELL_COUNT)
+)
+CELL_COL: tuple[int, ...] = tuple(
+    CELL_SQUARE[i] % 3 * 3 + i % SUD_SPACE_SIZE % 3 for i in range(SUD_CELL_COUNT)
+)
+
+ROWS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(cell_id(r, c) for c in range(SUD_SPACE_SIZE)) for r in range(SUD_SPACE_SIZE)
+)
+COLS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(cell_id(r, c) for r in range(SUD_SPACE_SIZE)) for c in range(SUD_SPACE_SIZE)
+)
+SQUARES: tuple[tuple[int, ...], ...] = tuple(
+    tuple(range(s * SUD_SPACE_SIZE, (s + 1) * SUD_SPACE_SIZE))
+    for s in range(SUD_SPACE_SIZE)
+)
+UNITS: tuple[tuple[int, ...], ...] = ROWS + COLS + SQUARES
+
+CELL_UNITS: tuple[tuple[int, int, int], ...] = tuple(
+    (
+        CELL_ROW[i],
+        SUD_SPACE_SIZE + CELL_COL[i],
+        2 * SUD_SPACE_SIZE + CELL_SQUARE[i],
+    )
+    for i in range(SUD_CELL_COUNT)
+)
+UNIT_SWEEP: tuple[int, ...] = tuple(u for units in CELL_UNITS for u in units)
+CELL_UNIT_POS: tuple[tuple[int, int, int], ...] = tuple(
+    tuple(UNITS[u].index(i) for u in CELL_UNITS[i]) for i in range(SUD_CELL_COUNT)  # type: ignore
+)
+
+
+def _next_in_unit(i: int, unit: tuple[int, ...]) -> int:
+    return unit[(unit.index(i) + 1) % SUD_SPACE_SIZE]
+
+
+NEXT: dict[str, tuple[int, ...]] = {
+    direction: tuple(
+        _next_in_unit(i, UNITS[CELL_UNITS[i][d]]) for i in range(SUD_CELL_COUNT)
+    )
+    for d, direction in enumerate(CSPACES)
+}
+
+PEERS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(sorted(set().union(*(UNITS[u] for u in CELL_UNITS[i])) - {i}))
+    for i in range(SUD_CELL_COUNT)
+)
+
+
+def _build_sublines() -> tuple[tuple[tuple[int, ...], ...], ...]:
+    sublines = []
+    for square in SQUARES:
+        bases = [(square[i], "col") for i in (0, 1, 2)]
+        bases += [(square[i], "row") for i in (0, 3, 6)]
+        for base, direction in bases:
+            unit = ROWS[CELL_ROW[base]] if direction == "row" else COLS[CELL_COL[base]]
+            # Walk the line from the base, the first 3 cells overlap the square, the other 6 do not
+            start = unit.index(base)
+            line = tuple(
+                unit[(start + j) % SUD_SPACE_SIZE] for j in range(SUD_SPACE_SIZE)
+            )
+            overlap = line[:3]
+            # Walk the square circularly starting after the overlap for rows and at the base for columns
+            start = square.index(overlap[2] if direction == "row" else base) + (
+                1 if direction == "row" else 0
+            )
+            walk = (square[(start + j) % SUD_SPACE_SIZE] for j in range(SUD_SPACE_SIZE))
+            square_non_over_lap = tuple(c for c in walk if c not in overlap)
+            sublines.append((overlap, square_non_over_lap, line[3:]))
+    return tuple(sublines)
+
+
+SUBLINES = _build_sublines()
+
+
+def _subline_units(overlap: tuple[int, ...]) -> tuple[int, int]:
+    line, square = sorted(set.intersection(*(set(CELL_UNITS[i]) for i in overlap)))
+    return line, square
+
+
+SUBLINE_UNITS: tuple[tuple[int, int], ...] = tuple(
+    _subline_units(overlap) for overlap, _, _ in SUBLINES
+)
+
+
+def _same_direction(a: int, b: int) -> bool:
+    return (SUBLINE_UNITS[a][0] in ROW_UNITS) == (SUBLINE_UNITS[b][0] in ROW_UNITS)
+
+
+SUBLINE_NEIGHBOURS: tuple[tuple[tuple[int, ...], tuple[int, ...]], ...] = tuple(
+    (
+        tuple(
+            j
+            for j in range(len(SUBLINES))
+            if j != i
+            and SUBLINE_UNITS[j][1] == SUBLINE_UNITS[i][1]
+            and _same_direction(i, j)
+        ),
+        tuple(
+            j
+            for j in range(len(SUBLINES))
+            if j != i and SUBLINE_UNITS[j][0] == SUBLINE_UNITS[i][0]
+        ),
+    )
+    for i in range(len(SUBLINES))
+)
+CELL_SUBLINES: tuple[tuple[int, ...], ...] = tuple(
+    tuple(j for j, (overlap, _, _) in enumerate(SUBLINES) if i in overlap)
+    for i in range(SUD_CELL_COUNT)
+)
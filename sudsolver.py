@@ -13,17 +13,20 @@ import os
 from PySide6.QtWidgets import QApplication
 from gui.gui_top import GuiTop
 from sudoku.sudoku import Sudoku
-from sudoku.puzzleio import PuzzleList
+from sudoku.puzzledb import migrate_yaml
 
 PUZZLE_YAML_FILE = "sudoku.yaml"
+PUZZLE_DB_FILE = "sudoku.db"
 HELP_FILE = "help.md"
 
 
 def main():
     path = os.path.dirname(sys.argv[0])
     yaml_full_path = os.path.join(path, PUZZLE_YAML_FILE)
+    db_full_path = os.path.join(path, PUZZLE_DB_FILE)
     help_full_path = os.path.join(path, HELP_FILE)
-    puzzles = PuzzleList(yaml_full_path)
+    # The puzzles of the YAML file move into the database the first time round
+    puzzles = migrate_yaml(yaml_full_path, db_full_path)
 
     # Model/Control
     solver = Sudoku()
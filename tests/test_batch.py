@@ -0,0 +1,123 @@
+import io
+import subprocess
+import sys
+import pytest
+from sudoku.batch import (
+    INVALID,
+    SOLVED,
+    STUCK,
+    UNSOLVABLE,
+    decode_puzzles,
+    decode_results,
+    encode_puzzles,
+    encode_results,
+    main,
+    parse_line,
+    read_puzzles,
+    solve_puzzles,
+    solve_puzzles_parallel,
+)
+
+EASY = (
+    "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+)
+SOLUTION = (
+    "243971586576384921918256743432869157761542398859137462394728615625413879187695234"
+)
+INKALA = (
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+)
+
+
+def test_batch_parse_line():
+    assert parse_line(EASY + "\n", 3) == ("3", EASY)
+    assert parse_line(f'puzzlepack01: "{EASY}" #end of line comment', 1) == (
+        "puzzlepack01",
+        EASY,
+    )
+    assert parse_line(EASY.replace("0", ".") + "  # rating 1.2", 1) == ("1", EASY)
+    assert parse_line("# just a comment", 1) is None
+    assert parse_line("   \n", 1) is None
+    lines = ["# header\n", EASY + "\n", "\n", f"inkala: {INKALA}\n"]
+    assert list(read_puzzles(lines)) == [("2", EASY), ("inkala", INKALA)]
+
+
+def test_batch_solve_puzzles():
+    puzzles = [
+        ("easy", EASY),
+        ("inkala", INKALA),
+        ("bad", "123"),
+        ("two", "22" + "0" * 79),
+    ]
+    results = list(solve_puzzles(puzzles, "logic"))
+    assert results[0] == ("easy", SOLUTION, SOLVED)
+    assert results[1][2] == STUCK
+    assert results[2] == ("bad", "123", INVALID)
+    assert results[3][2] == UNSOLVABLE
+    for method in ("search", "dlx"):
+        results = list(solve_puzzles(puzzles, method))
+        assert [r[2] for r in results] == [SOLVED, SOLVED, INVALID, UNSOLVABLE]
+        assert results[0][1] == SOLUTION
+    # Full grids which clash are unsolvable whatever the method
+    clashing = [("ones", "1" * 81), ("wrong", SOLUTION[:-1] + "1")]
+    for method in ("logic", "search", "dlx"):
+        assert list(solve_puzzles(clashing, method)) == [
+            (name, grid, UNSOLVABLE) for name, grid in clashing
+        ]
+    # Results stream out as the puzzles are read
+    results = solve_puzzles(iter([("easy", EASY)] * 3))
+    assert next(results) == ("easy", SOLUTION, SOLVED)
+
+
+def test_batch_main(tmp_path, monkeypatch, capsys):
+    puzzle_file = tmp_path / "puzzles.txt"
+    puzzle_file.write_text(f"# puzzles\n{EASY}\ninkala: {INKALA}\n")
+    assert main([str(puzzle_file)]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == f'2: "{SOLUTION}"  # solved'
+    assert out[1].startswith("inkala: ")
+    monkeypatch.setattr(sys, "stdin", io.StringIO(INKALA + "\n"))
+    assert main(["--method", "logic"]) == 1
+    assert capsys.readouterr().out.endswith("# stuck\n")
+
+
+def test_batch_encoding():
+    assert decode_puzzles(encode_puzzles([EASY, INKALA])) == [EASY, INKALA]
+    assert len(encode_puzzles([EASY, INKALA])) == 2 * 81
+    results = [(SOLUTION, SOLVED), (INKALA, STUCK)]
+    assert len(encode_results(results)) == 2 * 82
+    assert decode_results(encode_results(results)) == results
+
+
+def test_batch_parallel():
+    puzzles = [
+        (f"{i}", p) for i, p in enumerate([EASY, INKALA, "123", "22" + "0" * 79] * 3)
+    ]
+    expected = list(solve_puzzles(puzzles))
+    # Chunks smaller than the input, with an invalid line in some of them, still come back in order
+    assert list(solve_puzzles_parallel(puzzles, workers=2, chunksize=5)) == expected
+    assert list(solve_puzzles_parallel([], workers=2)) == []
+    for workers, chunksize in ((2, 0), (0, 5), (2, -1)):
+        with pytest.raises(ValueError):
+            list(solve_puzzles_parallel(puzzles, workers=workers, chunksize=chunksize))
+
+
+def test_batch_main_workers(tmp_path, capsys):
+    puzzle_file = tmp_path / "puzzles.txt"
+    puzzle_file.write_text(f"{EASY}\n{INKALA}\n" * 3)
+    assert main([str(puzzle_file), "--workers", "2", "--chunksize", "2"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert [line.split(":")[0] for line in out] == ["1", "2", "3", "4", "5", "6"]
+    assert out[0] == f'1: "{SOLUTION}"  # solved'
+    # Nothing would be solved with empty chunks, so the counts are checked up front
+    for option in ("--workers", "--chunksize"):
+        with pytest.raises(SystemExit):
+            main([str(puzzle_file), option, "0"])
+
+
+def test_batch_has_no_gui():
+    script = "import sys, sudoku.batch; print(any(m.startswith('PySide6') for m in sys.modules))"
+    out = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,75 @@
+import pytest
+from sudoku.bitboard import CELL_BIT, UNIT_BITS, BitBoard, count_solutions, iter_bits
+from sudoku.sudoku import Sudoku
+from sudoku.topology import ROW_UNITS, COL_UNITS, cell_id
+
+EASY = (
+    "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+)
+SOLUTION = (
+    "243971586576384921918256743432869157761542398859137462394728615625413879187695234"
+)
+
+
+def test_bitboard_load_and_place():
+    board = BitBoard.from_string(EASY)
+    assert board.to_string() == EASY
+    assert list(iter_bits(0b10110)) == [1, 2, 4]
+    # The given 2 in the corner rules 2 out of its peers
+    assert not board.candidates[1] & CELL_BIT[cell_id(0, 5)]
+    assert not board.place(cell_id(0, 5), 2)
+    with pytest.raises(ValueError):
+        BitBoard.from_string("22" + "0" * 79)
+
+
+def test_bitboard_singles_solve():
+    board = BitBoard.from_string(EASY)
+    assert board.naked_singles() or board.hidden_singles()
+    assert board.propagate_singles()
+    assert board.solved
+    assert board.to_string() == SOLUTION
+
+
+def test_bitboard_board_round_trip():
+    puzzle = Sudoku()
+    puzzle.load_sud(EASY)
+    puzzle.initialize()
+    puzzle.board.propagate()
+    board = BitBoard.from_board(puzzle.board)
+    assert board.cell_mask(1) == puzzle.cells[1].mask
+    assert board.propagate_singles()
+    board.write_to(puzzle.board)
+    assert puzzle.solved
+    assert not puzzle.in_error
+
+
+def test_bitboard_x_wing():
+    board = BitBoard()
+    # 5 is only possible in columns 1 and 7 of rows 2 and 6
+    for r in (2, 6):
+        board.candidates[4] &= ~UNIT_BITS[ROW_UNITS[r]]
+        board.candidates[4] |= CELL_BIT[cell_id(r, 1)] | CELL_BIT[cell_id(r, 7)]
+    assert board.fish(5, 2)
+    assert (
+        not board.candidates[4]
+        & UNIT_BITS[COL_UNITS[1]]
+        & ~(CELL_BIT[cell_id(2, 1)] | CELL_BIT[cell_id(6, 1)])
+    )
+    assert board.candidates[4] & CELL_BIT[cell_id(0, 0)]
+    assert not board.fish(5, 2)
+
+
+def test_bitboard_count_solutions():
+    assert count_solutions(EASY) == 1
+    assert count_solutions(SOLUTION) == 1
+    # hard_4 from sudoku.yaml has more than one solution
+    hard_4 = "700006800080050300005070200009000000040090060000000900002060500008040090007500004"
+    assert count_solutions(hard_4) == 2
+    assert count_solutions(hard_4, limit=5) == 5
+    assert count_solutions("0" * 81, limit=20) == 20
+    assert count_solutions("22" + "0" * 79) == 0
+    # Without its bottom right 4 the puzzle has two solutions, with the 4 moved one cell left it has none
+    assert count_solutions(EASY[:-1] + "0") == 2
+    assert count_solutions(EASY[:-2] + "40") == 0
+    with pytest.raises(ValueError):
+        count_solutions("123")
@@ -0,0 +1,19 @@
+from sudoku.bitmask import (
+    ALL_DIGITS,
+    DIGIT_MASK,
+    MASK_DIGITS,
+    POPCOUNT,
+    SINGLE_DIGIT,
+    digits_to_mask,
+)
+
+
+def test_bitmask_tables():
+    assert DIGIT_MASK[0] == 0
+    assert DIGIT_MASK[1] == 1
+    assert DIGIT_MASK[9] == 256
+    assert POPCOUNT[ALL_DIGITS] == 9
+    assert MASK_DIGITS[digits_to_mask((3, 5, 8))] == (3, 5, 8)
+    assert SINGLE_DIGIT[DIGIT_MASK[7]] == 7
+    assert SINGLE_DIGIT[digits_to_mask((1, 2))] == 0
+    assert SINGLE_DIGIT[0] == 0
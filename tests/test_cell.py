@@ -312,3 +312,15 @@ def test_cell_single_possible_location():
     assert result
     assert my_cell.solution == 3
     assert my_cell.new_solution
+
+
+def test_cell_potential_mask(setup_cell):
+    setup_cell.clear_potentials()
+    assert setup_cell.mask == 0
+    for i in (1, 2, 9):
+        setup_cell.add_potential(i)
+    assert setup_cell.mask == 0b100000011
+    assert setup_cell.remove_mask(0b000000110)
+    assert setup_cell.potentials == {1, 9}
+    assert setup_cell.eliminated == {2}
+    assert not setup_cell.remove_mask(0b000000110)
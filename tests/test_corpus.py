@@ -0,0 +1,122 @@
+import io
+import pytest
+from sudoku.corpus import (
+    HEADER,
+    HEADER_SIZE,
+    RECORD_SIZE,
+    Corpus,
+    corpus_to_text,
+    pack,
+    text_to_corpus,
+    unpack,
+    write_corpus,
+)
+
+EASY = (
+    "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+)
+INKALA = (
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+)
+
+
+def test_corpus_pack():
+    packed = pack(EASY)
+    assert len(packed) == RECORD_SIZE == 41
+    assert packed[:2] == bytes([0x20, 0x00])
+    assert packed[-1] == 0x40
+    assert unpack(packed) == EASY
+    assert pack(EASY.replace("0", ".")) == packed
+    for bad in ("123", "x" * 81, "1" * 80 + "-"):
+        with pytest.raises(ValueError):
+            pack(bad)
+
+
+def test_corpus_random_access(tmp_path):
+    path = str(tmp_path / "puzzles.sudc")
+    puzzles = [EASY, INKALA] * 50
+    assert write_corpus(path, iter(puzzles)) == 100
+    assert (tmp_path / "puzzles.sudc").stat().st_size == HEADER_SIZE + 100 * 41
+    with Corpus(path) as corpus:
+        assert len(corpus) == 100
+        assert not corpus.has_names
+        assert corpus[0] == EASY and corpus[-1] == INKALA
+        assert corpus[3:7] == [INKALA, EASY, INKALA, EASY]
+        assert list(corpus) == puzzles
+        assert corpus.name(5) == "5"
+        record = corpus.record(1)
+        assert record.readonly and unpack(record) == INKALA
+        record.release()
+        block = corpus.records(2, 4)
+        assert len(block) == 2 * RECORD_SIZE and unpack(block[RECORD_SIZE:]) == INKALA
+        block.release()
+        with pytest.raises(IndexError):
+            corpus[100]
+
+
+def test_corpus_text_round_trip(tmp_path):
+    path = str(tmp_path / "puzzles.sudc")
+    lines = [
+        "# puzzles\n",
+        f'puzzlepack01: "{EASY}" #end of line comment\n',
+        f"{INKALA}\n",
+    ]
+    assert text_to_corpus(lines, path) == 2
+    with Corpus(path) as corpus:
+        assert corpus.has_names
+        assert [corpus.name(0), corpus.name(1)] == ["puzzlepack01", "3"]
+        out = io.StringIO()
+        corpus_to_text(corpus, out)
+    assert out.getvalue() == f'puzzlepack01: "{EASY}"\n3: "{INKALA}"\n'
+    write_corpus(path, [EASY, INKALA], ["één", "two"])
+    with Corpus(path) as corpus:
+        assert corpus.name(0) == "één" and corpus[1] == INKALA
+    (tmp_path / "bad.sudc").write_bytes(b"not a corpus" * 4)
+    with pytest.raises(ValueError):
+        Corpus(str(tmp_path / "bad.sudc"))
+
+
+def test_corpus_bad_records(tmp_path):
+    # A nibble above 9 isn't a digit
+    with pytest.raises(ValueError):
+        unpack(pack(EASY)[:-1] + b"\xa0")
+    path = tmp_path / "puzzles.sudc"
+    write_corpus(str(path), [EASY])
+    data = bytearray(path.read_bytes())
+    data[HEADER_SIZE] = 0xF2
+    path.write_bytes(data)
+    with Corpus(str(path)) as corpus:
+        with pytest.raises(ValueError):
+            corpus[0]
+    # A bad line leaves no partial corpus, or temporary file, behind and an existing corpus untouched
+    path.unlink()
+    with pytest.raises(ValueError):
+        text_to_corpus([f"{EASY}\n", "123\n"], str(path))
+    assert list(tmp_path.iterdir()) == []
+    write_corpus(str(path), [EASY])
+    with pytest.raises(ValueError):
+        write_corpus(str(path), [INKALA, "x"])
+    with Corpus(str(path)) as corpus:
+        assert list(corpus) == [EASY]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_corpus_bad_layout(tmp_path):
+    path = tmp_path / "puzzles.sudc"
+    write_corpus(str(path), [EASY, INKALA], ["one", "two"])
+    data = path.read_bytes()
+    records_end = HEADER_SIZE + 2 * RECORD_SIZE
+    header = HEADER.unpack_from(data)
+    bad = {
+        # Records cut short, the whole name index missing, part of the names missing
+        "truncated": data[: HEADER_SIZE + RECORD_SIZE + 10],
+        "no_index": data[:records_end],
+        "short_names": data[:-2],
+        # More puzzles than the file holds, the index somewhere other than after the records
+        "count": HEADER.pack(*header[:3], 1000, header[4]) + data[HEADER_SIZE:],
+        "index_offset": HEADER.pack(*header[:4], records_end + 8) + data[HEADER_SIZE:],
+    }
+    for name, content in bad.items():
+        (tmp_path / name).write_bytes(content)
+        with pytest.raises(ValueError):
+            Corpus(str(tmp_path / name))
@@ -0,0 +1,72 @@
+import pytest
+from sudoku import dlx
+from sudoku.dlx import DancingLinks, row_columns
+from sudoku.sudoku import Sudoku
+from sudoku.topology import ROW_MAJOR
+
+EASY = (
+    "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+)
+SOLUTION = (
+    "243971586576384921918256743432869157761542398859137462394728615625413879187695234"
+)
+INKALA = (
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+)
+INKALA_SOLUTION = (
+    "812753649943682175675491283154237896369845721287169534521974368438526917796318452"
+)
+# hard_4 from sudoku.yaml, which has more than one solution
+HARD_4 = (
+    "700006800080050300005070200009000000040090060000000900002060500008040090007500004"
+)
+
+
+def test_dlx_solve():
+    links = DancingLinks()
+    assert links.solve(EASY) == SOLUTION
+    assert links.solve(INKALA) == INKALA_SOLUTION
+    assert links.solve(INKALA.replace("0", ".")) == INKALA_SOLUTION
+    assert dlx.solve(EASY) == SOLUTION
+
+
+def test_dlx_solutions_limit():
+    links = DancingLinks()
+    assert links.solutions(EASY) == [SOLUTION]
+    found = links.solutions(HARD_4, 2)
+    assert len(found) == 2 and found[0] != found[1]
+    for solution in found:
+        assert all(a in ("0", b) for a, b in zip(HARD_4, solution))
+    assert len(links.solutions("0" * 81, 5)) == 5
+    assert links.solutions(EASY, 0) == []
+
+
+def test_dlx_invalid():
+    links = DancingLinks()
+    # Two 2s in the first row
+    assert links.solutions("22" + "0" * 79) == []
+    assert links.solve("22" + "0" * 79) is None
+    with pytest.raises(ValueError):
+        links.solve("123")
+    with pytest.raises(ValueError):
+        links.solve("x" * 81)
+
+
+def test_dlx_links_restored():
+    links = DancingLinks()
+    before = (links.left[:], links.right[:], links.up[:], links.down[:], links.size[:])
+    links.solve(INKALA)
+    links.solutions(HARD_4, 2)
+    links.solutions("22" + "0" * 79)
+    assert (links.left, links.right, links.up, links.down, links.size) == before
+    assert len(set(row_columns(0))) == 4
+
+
+def test_dlx_oracle_for_logical_rules():
+    """The logical rules reach the same solution as the complete solver"""
+    puzzle = Sudoku()
+    puzzle.load_sud(EASY)
+    puzzle.initialize()
+    assert puzzle.solve_logically().solved
+    found = "".join(str(puzzle.cells[i].solution) for i in ROW_MAJOR)
+    assert found == dlx.solve(EASY)
@@ -0,0 +1,156 @@
+import pytest
+from sudoku.board import FIELD_COUNT
+from sudoku.history import History
+from sudoku.sudoku import Sudoku
+from sudoku.rules import (
+    AlignedPotentialsRule,
+    EliminationToOneRule,
+    FilledCellsRule,
+    SinglePossibleLocationRule,
+)
+
+PUZZLE = (
+    "000260500205001006000000803080009000002000700000300080501000000400600109006023000"
+)
+RULES = [
+    EliminationToOneRule,
+    SinglePossibleLocationRule,
+    AlignedPotentialsRule,
+    FilledCellsRule,
+] * 3
+
+
+def test_history_checkpoint_bookkeeping():
+    history = History(checkpoint_interval=2, max_checkpoint_bytes=30)
+    for i in range(6):
+        history.push_rule(EliminationToOneRule("all"))
+        if history.should_checkpoint(history.curr_ptr):
+            history.save_checkpoint(history.curr_ptr, bytes(10), True)
+    # Saved at 1, 3 and 5
+    assert history.checkpoint_bytes == 30
+    assert history.nearest_checkpoint(4)[0] == 3
+    assert history.nearest_checkpoint(0) == (History.START, None)
+    history.push_rule(EliminationToOneRule("all"))
+    history.save_checkpoint(history.curr_ptr, bytes(10), True)
+    # Over the cap, the furthest checkpoint (1) is evicted
+    assert history.nearest_checkpoint(2)[0] == History.START
+    history.curr_ptr = 3
+    history.prune()
+    assert history.nearest_checkpoint(6)[0] == 3
+    history.delete_current()
+    assert history.nearest_checkpoint(6) == (History.START, None)
+    with pytest.raises(ValueError):
+        History(checkpoint_interval=0)
+
+
+@pytest.mark.parametrize("interval", [1, 3, 100])
+def test_history_replay_from_checkpoints(interval):
+    puzzle = Sudoku()
+    puzzle.history = History(checkpoint_interval=interval)
+    puzzle.load_sud(PUZZLE)
+    puzzle.initialize()
+    states = [puzzle.snapshot()]
+    for rule in RULES:
+        puzzle.run_rule(rule("all"))
+        states.append(puzzle.snapshot())
+    for i in range(len(RULES) - 1, -1, -1):
+        puzzle.replay_history("back")
+        assert puzzle.snapshot() == states[i]
+    assert puzzle.initial_state
+    for i in range(1, len(RULES) + 1):
+        puzzle.replay_history("forward")
+        assert puzzle.snapshot() == states[i]
+        assert not puzzle.initial_state
+
+
+@pytest.mark.parametrize("interval", [1, 3])
+def test_history_delete_matches_fresh_run(interval):
+    puzzle = Sudoku()
+    puzzle.history = History(checkpoint_interval=interval)
+    puzzle.load_sud(PUZZLE)
+    puzzle.initialize()
+    for rule in RULES:
+        puzzle.run_rule(rule("all"))
+    for _ in range(5):
+        puzzle.replay_history("back")
+    deleted = puzzle.history.curr_ptr
+    puzzle.delete_current_history_event()
+    remaining = RULES[:deleted] + RULES[deleted + 1 :]
+    fresh = Sudoku()
+    fresh.load_sud(PUZZLE)
+    fresh.initialize()
+    for rule in remaining:
+        fresh.run_rule(rule("all"))
+    for _ in range(len(remaining) - puzzle.history.curr_ptr - 1):
+        puzzle.replay_history("forward")
+    assert puzzle.history.at_end
+    assert puzzle.snapshot() == fresh.snapshot()
+
+
+def test_history_journal_undo_redo():
+    puzzle = Sudoku(history_backend="journal")
+    puzzle.load_sud(PUZZLE)
+    puzzle.initialize()
+    states = [(puzzle.snapshot(), puzzle.board.solved_count)]
+    for rule in RULES:
+        puzzle.run_rule(rule("all"))
+        states.append((puzzle.snapshot(), puzzle.board.solved_count))
+    assert puzzle.history.checkpoint_bytes == 0
+    assert 0 < puzzle.history.journal_bytes < len(RULES) * len(states[0][0])
+    for i in range(len(RULES) - 1, -1, -1):
+        puzzle.replay_history("back")
+        assert (puzzle.snapshot(), puzzle.board.solved_count) == states[i]
+    assert puzzle.initial_state
+    assert not puzzle.replay_history("back")
+    for i in range(1, len(RULES) + 1):
+        puzzle.replay_history("forward")
+        assert (puzzle.snapshot(), puzzle.board.solved_count) == states[i]
+    with pytest.raises(ValueError):
+        History(backend="tape")
+
+
+def test_history_journal_logs_changed_cells():
+    """The delta from a mark is built from the logged cells alone and matches comparing the whole board"""
+    puzzle = Sudoku(history_backend="journal")
+    puzzle.load_sud(PUZZLE)
+    puzzle.initialize()
+    board = puzzle.board
+    for rule in RULES:
+        before = board.mark()
+        puzzle.run_rule(rule("all"), history_mode=True)
+        delta = board.delta_since(before)
+        # A copy of the snapshot isn't the mark, so every cell is compared
+        assert delta == board.delta_since(bytearray(before))
+        assert {
+            delta[e] for e in range(0, len(delta), FIELD_COUNT + 1)
+        } <= board.changed
+    # Nothing written, nothing logged
+    before = board.mark()
+    assert not board.changed and len(board.delta_since(before)) == 0
+
+
+@pytest.mark.parametrize("back", [1, 5, len(RULES)])
+def test_history_journal_delete_matches_fresh_run(back):
+    puzzle = Sudoku(history_backend="journal")
+    puzzle.load_sud(PUZZLE)
+    puzzle.initialize()
+    for rule in RULES:
+        puzzle.run_rule(rule("all"))
+    for _ in range(back - 1):
+        puzzle.replay_history("back")
+    deleted = puzzle.history.curr_ptr
+    puzzle.delete_current_history_event()
+    remaining = RULES[:deleted] + RULES[deleted + 1 :]
+    fresh = Sudoku()
+    fresh.load_sud(PUZZLE)
+    fresh.initialize()
+    for rule in remaining[:deleted]:
+        fresh.run_rule(rule("all"))
+    assert puzzle.history.curr_ptr == deleted - 1
+    assert puzzle.snapshot() == fresh.snapshot()
+    for rule in remaining[deleted:]:
+        fresh.run_rule(rule("all"))
+    while not puzzle.history.at_end:
+        puzzle.replay_history("forward")
+    assert puzzle.snapshot() == fresh.snapshot()
+    assert puzzle.board.error_cells == fresh.board.error_cells
@@ -0,0 +1,60 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sudoku.npengine import ACTIVE, ERROR, SOLVED, STUCK, BatchEngine  # noqa: E402
+from sudoku.rules import (  # noqa: E402
+    AlignedPotentialsRule,
+    EliminationToOneRule,
+    SinglePossibleLocationRule,
+)
+from sudoku.sudoku import Sudoku  # noqa: E402
+
+EASY = (
+    "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+)
+SOLUTION = (
+    "243971586576384921918256743432869157761542398859137462394728615625413879187695234"
+)
+INKALA = (
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+)
+# puzzlepack26 from sudoku.yaml, the vectorized rules get part of the way
+PACK26 = (
+    "820500000000002063004300205005000040000146000090000100201003800570800000000001027"
+)
+
+
+def test_npengine_batch():
+    engine = BatchEngine([EASY, INKALA, "22" + "0" * 79, PACK26.replace("0", ".")])
+    assert len(engine) == 4
+    status = engine.run()
+    assert list(status) == [SOLVED, STUCK, ERROR, STUCK]
+    boards = engine.to_strings()
+    assert boards[0] == SOLUTION
+    assert boards[1] == INKALA
+    # The same rules run on the Sudoku stop at the same place
+    puzzle = Sudoku()
+    puzzle.load_sud(PACK26)
+    puzzle.initialize()
+    puzzle.solve_logically(
+        (EliminationToOneRule, SinglePossibleLocationRule, AlignedPotentialsRule),
+        record_history=False,
+    )
+    assert boards[3] == puzzle.to_sud() != PACK26
+    # Finished puzzles are left alone
+    assert engine.step() == 0
+
+
+def test_npengine_steps():
+    engine = BatchEngine([EASY] * 3)
+    assert engine.step() == 3
+    assert (engine.status == ACTIVE).all()
+    engine.run(max_steps=2)
+    assert engine.steps == 2
+    engine.run()
+    assert (engine.status == SOLVED).all()
+    with pytest.raises(ValueError):
+        BatchEngine(["123"])
+    with pytest.raises(ValueError):
+        BatchEngine(["x" * 81])
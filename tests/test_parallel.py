@@ -0,0 +1,33 @@
+from sudoku import dlx
+from sudoku.parallel import parallel_search, split
+
+# hard_3 from sudoku.yaml, it needs a few hundred search nodes
+HARD_3 = (
+    "120300000400000300003050000004200500000080009060005070001500200000090060000007008"
+)
+EASY = (
+    "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+)
+
+
+def test_split():
+    branches, solution = split(HARD_3, 8)
+    assert solution is None
+    assert len(branches) >= 8
+    # Each branch adds speculative values to the puzzle's givens
+    for branch in branches:
+        assert all(a in ("0", b) for a, b in zip(HARD_3, branch))
+    # One branch holds the solution
+    answer = dlx.solve(HARD_3)
+    assert sum(dlx.solve(b) == answer for b in branches) == 1
+    assert split(EASY, 8) == ([], dlx.solve(EASY))
+    assert split("22" + "0" * 79, 8) == ([], None)
+
+
+def test_parallel_search():
+    report = parallel_search(HARD_3, workers=2)
+    assert report.solution == dlx.solve(HARD_3)
+    assert report.branches >= 8
+    assert report.nodes > 0
+    report = parallel_search(EASY, workers=2)
+    assert report.solution == dlx.solve(EASY) and report.branches == 0
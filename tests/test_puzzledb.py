@@ -0,0 +1,65 @@
+import pytest
+from sudoku.puzzledb import SqlitePuzzleList, migrate_yaml
+from sudoku.puzzleio import PuzzleList
+
+PACK01 = (
+    "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+)
+PACK20 = (
+    "040000100000004609050130800007306290000040000083201400004098070805400000002000080"
+)
+
+
+@pytest.fixture()
+def yaml_file(tmp_path):
+    path = tmp_path / "puzzles.yaml"
+    path.write_text(
+        "# An example yaml file, this comment should be preserved\n"
+        f'puzzlepack01: "{PACK01}" #end of line comment\n'
+        "# comment between 01 and 20\n"
+        f'puzzlepack20: "{PACK20}"\n'
+    )
+    return path
+
+
+def test_puzzledb_add_delete(tmp_path):
+    db_file = tmp_path / "puzzles.db"
+    p = SqlitePuzzleList(db_file)
+    assert len(p.puzzles) == 0
+    p.add("b", PACK20)
+    p.add("a", PACK01)
+    p.add("a", "9" * 81)
+    p.update()
+    assert p.puzzles["a"] == PACK01
+    assert list(p.puzzles.keys()) == ["b", "a"]
+    assert "b" in p.puzzles and "c" not in p.puzzles
+    p.delete("b")
+    with pytest.raises(KeyError):
+        p.delete("b")
+    with pytest.raises(KeyError):
+        p.puzzles["b"]
+    assert p.add_many([("a", PACK20), ("c", PACK20), ("d", PACK01)]) == 2
+    p.close()
+    # Everything is on disk without an explicit write
+    p = SqlitePuzzleList(db_file, validate=True)
+    assert dict(p.puzzles) == {"a": PACK01, "c": PACK20, "d": PACK01}
+    with pytest.raises(ValueError):
+        p.add("nines", "9" * 81)
+    p.close()
+
+
+def test_puzzledb_migrate(tmp_path, yaml_file):
+    db_file = tmp_path / "puzzles.db"
+    p = migrate_yaml(yaml_file, db_file)
+    assert dict(p.puzzles) == {"puzzlepack01": PACK01, "puzzlepack20": PACK20}
+    assert "# comment between 01 and 20" in p.archive("puzzles.yaml")
+    p.delete("puzzlepack01")
+    p.close()
+    # Only the first open migrates
+    p = migrate_yaml(yaml_file, db_file)
+    assert list(p.puzzles) == ["puzzlepack20"]
+    # Export back to a file PuzzleList can read
+    out = tmp_path / "export.yaml"
+    p.write(out)
+    assert PuzzleList(out).puzzles == {"puzzlepack20": PACK20}
+    p.close()
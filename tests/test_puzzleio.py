@@ -1,5 +1,10 @@
 import pytest
-from sudoku.puzzleio import PuzzleList, convert_to_ns_format
+from sudoku.puzzleio import (
+    PuzzleList,
+    convert_to_ns_format,
+    load_puzzles,
+    parse_puzzles,
+)
 
 
 @pytest.fixture
@@ -74,6 +79,23 @@ def test_puzzleio_add_same_is_ignored(yaml_file):
     )
 
 
+def test_puzzleio_add_validate(yaml_file):
+    p = PuzzleList(yaml_file, validate=True)
+    with pytest.raises(ValueError):
+        p.add("all_nines", "9" * 81)
+    with pytest.raises(ValueError):
+        # hard_4 from sudoku.yaml, which has more than one solution
+        p.add(
+            "hard_4",
+            "700006800080050300005070200009000000040090060000000900002060500008040090007500004",
+        )
+    p.add(
+        "test_puzzle01",
+        "040000100000004609050130800007306290000040000083201400004098070805400000002000080",
+    )
+    assert len(p.puzzles) == 4
+
+
 def test_puzzleio_write_preserves_comments(yaml_file, tmp_path):
     tmp_test_out = tmp_path / "test_preserve_write.yaml"
     p = PuzzleList(yaml_file)
@@ -112,3 +134,40 @@ def test_convert_to_ns_format():
     )
     converted_puzzles = convert_to_ns_format(puzzle1)
     assert converted_puzzles == init1
+
+
+def test_parse_puzzles():
+    puzzle1 = "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+    grid = b"""# An sdk style grid
+2..|.7.|.86
+57.|..4|...
+.1.|..6|.43
+---+---+---
+...|.69|..7
+..1|...|3..
+8..|13.|...
+---+---+---
+
+39.|7..|.1.
+...|4..|.79
+18.|.9.|..4
+"""
+    lines = (
+        f"{puzzle1}\n{puzzle1.replace('0', '.')}  1.2\n{puzzle1};rated\n\n"
+        f"{puzzle1} # comment\n"
+    ).encode()
+    assert list(parse_puzzles(lines)) == [puzzle1.encode()] * 4
+    assert list(parse_puzzles(memoryview(grid + lines))) == [puzzle1.encode()] * 5
+    spaced = "\n".join(" ".join(puzzle1[r * 9 : r * 9 + 9]) for r in range(9))
+    assert list(load_puzzles(spaced.encode())) == [convert_to_ns_format(puzzle1)]
+    for bad, line in (
+        (b"123\n", 1),
+        (b"\n" + puzzle1.encode() + b"1", 2),
+        (b"22" + b"0" * 79, 1),
+        (grid[:60], 2),
+        (b"x" * 81, 1),
+        (puzzle1.encode() + b"x", 1),
+        (grid.replace(b"---+---+---\n", b"---+---+---\n|||\n", 1), 6),
+    ):
+        with pytest.raises(ValueError, match=f"line {line}"):
+            list(parse_puzzles(bad))
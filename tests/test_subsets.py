@@ -0,0 +1,42 @@
+from sudoku.bitmask import MASK_DIGITS, digits_to_mask
+from sudoku.subsets import SUBSETS, locked_subsets, transpose, untranspose
+
+
+def masks(*cells):
+    return tuple(digits_to_mask(c) for c in cells)
+
+
+def test_subsets_tables():
+    assert len(SUBSETS[9][4]) == 126
+    assert SUBSETS[4][2][0] == (0, 1)
+    assert SUBSETS[3][3] == ((0, 1, 2),)
+    rows = masks((1, 2), (2, 3), (3,))
+    digits = MASK_DIGITS[digits_to_mask((1, 2, 3))]
+    assert transpose(rows, digits) == [0b001, 0b011, 0b110]
+    assert untranspose(transpose(rows, digits), digits, 3) == list(rows)
+
+
+def test_subsets_naked_and_hidden():
+    # Cells 0 and 1 are a naked pair of 1 and 2, which leaves 5 alone in cell 4
+    unit = masks((1, 2), (1, 2), (1, 3, 4, 5), (2, 3, 4, 5), (1, 5))
+    expected = masks((1, 2), (1, 2), (3, 4), (3, 4), (5,))
+    assert locked_subsets(unit, hidden_first=True) == expected
+    assert locked_subsets(unit, hidden_first=False) == expected
+
+
+def test_subsets_contradiction_stops_search():
+    # Three cells share only two digits, nothing is eliminated
+    unit = masks((1, 2), (1, 2), (1, 2), (1, 2, 3, 4), (3, 4))
+    assert locked_subsets(unit, hidden_first=False) == tuple(unit)
+    # An empty cell
+    unit = masks((), (1, 2))
+    assert locked_subsets(unit, hidden_first=True) == tuple(unit)
+
+
+def test_subsets_cache():
+    locked_subsets.cache_clear()
+    unit = masks((1, 2), (1, 2), (1, 2, 3))
+    first = locked_subsets(unit, True)
+    assert locked_subsets.cache_info().misses == 1
+    assert locked_subsets(unit, True) == first
+    assert locked_subsets.cache_info().hits == 1
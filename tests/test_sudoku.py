@@ -1,9 +1,15 @@
 import pytest
-from sudoku.sudoku import Sudoku
+from sudoku.defines import SUD_SPACE_SIZE
+from sudoku.sudoku import LOGIC_RULES, Sudoku
+from sudoku.topology import UNITS
 from sudoku.rules import (
+    EliminationRule,
     EliminationToOneRule,
     FilledCellsRule,
+    FilledPotentialsRule,
     SinglePossibleLocationRule,
+    SpeculativeSolution,
+    UnitRule,
 )
 
 
@@ -294,3 +300,320 @@ def test_sudoku_matched_triplets():
     progress = puzzle.run_rule(FilledCellsRule("all"))
     assert progress
     assert puzzle.ns[0].cell(0, 0).potentials == {1, 2, 3}
+
+
+def test_sudoku_snapshot_restore():
+    puzzle = Sudoku()
+    puzzle.load_sud(
+        "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+    )
+    puzzle.initialize()
+    snap = puzzle.snapshot()
+    init_sols = puzzle._solutions
+    puzzle.run_rule(EliminationToOneRule("all"))
+    after_sols = puzzle._solutions
+    after_pots = [c.potentials for c in puzzle.cells]
+    assert after_sols != init_sols
+    later = puzzle.snapshot()
+    puzzle.restore(snap)
+    assert puzzle._solutions == init_sols
+    assert all(len(c.potentials) == 9 for c in puzzle.cells if not c.solved)
+    puzzle.restore(later)
+    assert puzzle._solutions == after_sols
+    assert [c.potentials for c in puzzle.cells] == after_pots
+
+
+def test_sudoku_incremental_propagation():
+    puzzle = Sudoku()
+    puzzle.load_sud(
+        "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+    )
+    puzzle.initialize()
+    # The givens are queued, nothing is eliminated until the first rule runs
+    assert puzzle.ns[0].cells[1].potentials == set(range(1, 10))
+    progress = puzzle.run_rule(EliminationRule("all"))
+    # Propagation already removed everything the full pass could find
+    assert not progress
+    assert puzzle.ns[0].cells[1].eliminated == {1, 2, 5, 6, 7, 8, 9}
+    # A speculative solution is pushed out to its peers in the same step
+    puzzle.run_rule(SpeculativeSolution(1, 3))
+    assert puzzle.ns[0].cells[1].solution == 3
+    assert puzzle.ns[0].cells[1].speculative_solution
+    assert 3 in puzzle.ns[0].cells[2].eliminated
+    assert 3 not in puzzle.ns[1].cells[0].potentials
+
+
+def test_sudoku_unit_counters():
+    puzzle = Sudoku()
+    puzzle.load_sud(
+        "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+    )
+    puzzle.initialize()
+    assert puzzle.board.solved_count == 30
+    assert puzzle.board.digit_solved_in_unit(0, 2)
+    assert not puzzle.board.digit_solved_in_unit(0, 3)
+    assert not puzzle.in_error
+    # Cell 1 is in row 0 with the given 2, placing another 2 flags both cells
+    puzzle.cells[1].set_solution(2)
+    assert puzzle.in_error
+    assert puzzle.board.error_cells == {0, 1}
+    assert puzzle.cells[0].in_error
+    puzzle.initialize()
+    assert not puzzle.in_error
+    assert puzzle.board.solved_count == 30
+    assert not puzzle.ns[0].solved
+
+
+def test_sudoku_solved_counter():
+    puzzle = Sudoku()
+    solution = "243971586576384921918256743432869157761542398859137462394728615625413879187695234"
+    puzzle.load_sud(solution)
+    puzzle.initialize()
+    assert puzzle.solved
+    assert all(ns.solved for ns in puzzle.ns)
+    assert not puzzle.in_error
+
+
+def test_sudoku_unit_rules():
+    class CountingRule(UnitRule):
+        _name = "counting"
+
+        def __init__(self, target):
+            super().__init__(target)
+            self.units = []
+
+        def run(self, structure):
+            self.units.append(structure)
+            return False
+
+    puzzle = Sudoku()
+    puzzle.load_sud(
+        "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+    )
+    puzzle.initialize()
+    assert len(puzzle.rule_engine.units) == 27
+    # Nothing changes so each unit is analyzed exactly once in a pass
+    counter = CountingRule("all")
+    assert not puzzle.run_rule(counter)
+    assert len(counter.units) == 27
+    assert len({id(u) for u in counter.units}) == 27
+    # An int target is a unit number, rows then cols then squares
+    counter = CountingRule(9)
+    puzzle.run_rule(counter)
+    assert [c.id for c in counter.units[0]] == [0, 3, 6, 27, 30, 33, 54, 57, 60]
+    # The single 9 fills cell 6, so it is removed from the rest of square 0 only
+    assert puzzle.run_rule(FilledPotentialsRule(18))
+    assert puzzle.ns[0].cells[2].potentials == {3, 4}
+    assert puzzle.ns[0].cells[8].potentials == {8}
+    assert all(not c.eliminated for c in puzzle.cells[SUD_SPACE_SIZE:])
+
+
+def test_sudoku_blank_board():
+    """A new board is cleared from the blank templates, the counters match rebuilding them from the buffer"""
+    puzzle = Sudoku()
+    board = puzzle.board
+    locations = list(board.locations)
+    board.restore(board.snapshot())
+    assert list(board.locations) == locations
+    assert all(c.potentials == set(range(1, 10)) for c in puzzle.cells)
+    # The cells and sublines pick their neighbours out of the topology tables when asked
+    cell = puzzle.cells[40]
+    assert [c.id for c in cell.network.clist["row"]] == list(UNITS[4])
+    assert len(cell.network.peers) == 20 and cell not in cell.network.peers
+    assert cell.network.traverse("square") is puzzle.cells[41]
+    assert [c.id for c in puzzle.sublines[0].overlap] == [0, 3, 6]
+
+
+def test_sudoku_unit_sweep():
+    """The fixed sweep of a full board is the one worked out from the cell networks"""
+    puzzle = Sudoku()
+    engine = puzzle.rule_engine
+    assert list(engine._unit_sweep) == engine._build_unit_sweep(
+        puzzle.cells, puzzle.units
+    )
+
+
+def test_sudoku_rules_skip_clean_structures():
+    puzzle = Sudoku()
+    puzzle.load_sud(
+        "200070086570004000010006043000069007001000300800130000390700010000400079180090004"
+    )
+    puzzle.initialize()
+    engine = puzzle.rule_engine
+    while puzzle.run_rule(EliminationToOneRule("all")):
+        pass
+    # The last pass made no progress, so nothing has changed and the next pass skips every cell
+    assert not puzzle.run_rule(EliminationToOneRule("all"))
+    assert engine.skipped["elimination_to_one"] >= 81
+    # A change only dirties the cells which share a unit with it
+    before = engine.analyzed["elimination_to_one"]
+    cell = next(c for c in puzzle.cells if len(c.potentials) > 2)
+    cell.remove_mask(cell.mask & -cell.mask)
+    assert not puzzle.run_rule(EliminationToOneRule("all"))
+    assert engine.analyzed["elimination_to_one"] - before == 21
+    # Restoring the board dirties everything
+    puzzle.restore(puzzle.snapshot())
+    before = engine.analyzed["filled_cells"]
+    puzzle.run_rule(FilledCellsRule("all"))
+    puzzle.restore(puzzle.snapshot())
+    puzzle.run_rule(FilledCellsRule("all"))
+    assert engine.analyzed["filled_cells"] - before >= 2 * 27
+
+
+def test_sudoku_location_index():
+    def expected_locations(board):
+        return [
+            sum(1 << p for p, i in enumerate(unit) if board.masks[i] & (1 << d))
+            for unit in UNITS
+            for d in range(SUD_SPACE_SIZE)
+        ]
+
+    puzzle = Sudoku(history_backend="journal")
+    puzzle.load_sud(
+        "000260500205001006000000803080009000002000700000300080501000000400600109006023000"
+    )
+    puzzle.initialize()
+    assert list(puzzle.board.locations) == expected_locations(puzzle.board)
+    for rule in (EliminationToOneRule, SinglePossibleLocationRule, FilledCellsRule):
+        puzzle.run_rule(rule("all"))
+        assert list(puzzle.board.locations) == expected_locations(puzzle.board)
+    puzzle.replay_history("back")
+    assert list(puzzle.board.locations) == expected_locations(puzzle.board)
+    puzzle.cells[2].add_potential(1)
+    assert list(puzzle.board.locations) == expected_locations(puzzle.board)
+    # The index agrees with counting the potentials
+    rule = SinglePossibleLocationRule("all")
+    assert rule._gather_multiples(puzzle.cells[0], 1, "row") == {
+        d
+        for d in range(1, 10)
+        if sum(1 for c in puzzle.cells[0].network.clist["row"] if d in c.potentials)
+        == 1
+    }
+
+
+@pytest.mark.parametrize("backend", ["checkpoint", "journal"])
+def test_sudoku_solve_logically(backend):
+    puzzle = Sudoku(history_backend=backend)
+    puzzle.load_sud(
+        "000260500205001006000000803080009000002000700000300080501000000400600109006023000"
+    )
+    puzzle.initialize()
+    report = puzzle.solve_logically()
+    assert report.solved and puzzle.solved
+    assert not report.in_error
+    assert report.steps == puzzle.history.tail_ptr + 1
+    assert set(report.runs) == set(report.timings)
+    assert report.runs["elimination_to_one"] >= report.steps
+    solution = puzzle._solutions
+    # Every progressing rule is in the history and replays to the same solution
+    while puzzle.history.curr_ptr != puzzle.history.START:
+        puzzle.replay_history("back")
+    assert not puzzle.solved
+    for _ in range(report.steps):
+        puzzle.replay_history("forward")
+    assert puzzle._solutions == solution
+
+
+def _stepped_states(backend, solve):
+    """Full board snapshots after solve, then stepping back to the start and forward to the end again"""
+    puzzle = Sudoku(history_backend=backend)
+    puzzle.load_sud(
+        "820500000000002063004300205005000040000146000090000100201003800570800000000001027"
+    )
+    puzzle.initialize()
+    solve(puzzle)
+    states = [puzzle.snapshot()]
+    while not puzzle.history.at_beginning:
+        puzzle.replay_history("back")
+        states.append(puzzle.snapshot())
+    while not puzzle.history.at_end:
+        puzzle.replay_history("forward")
+        states.append(puzzle.snapshot())
+    return states
+
+
+@pytest.mark.parametrize(
+    "solve",
+    [Sudoku.solve_logically, Sudoku.search],
+    ids=["solve_logically", "search"],
+)
+def test_sudoku_solve_history_backends(solve):
+    """Stepping through a recorded solve gives the same boards, marks and all, with either history backend"""
+    checkpoint = _stepped_states("checkpoint", solve)
+    assert len(checkpoint) > 3
+    assert _stepped_states("journal", solve) == checkpoint
+
+
+def test_sudoku_solve_logically_fixpoint():
+    """A puzzle with two solutions can't be solved by logic alone, the solver stops when no rule progresses"""
+    puzzle = Sudoku()
+    puzzle.load_sud(
+        "000000000000000000000000000000000000000000000000000000000000000000000000000000001"
+    )
+    puzzle.initialize()
+    report = puzzle.solve_logically(record_history=False)
+    assert not report.solved and not report.in_error
+    # Pushing out the given is the only step
+    assert report.steps == 1
+    assert puzzle.history.tail_ptr == puzzle.history.START
+    assert list(report.runs) == [rule("all").name for rule in LOGIC_RULES]
+
+
+def test_sudoku_solve_logically_full_grid_in_error():
+    solution = "243971586576384921918256743432869157761542398859137462394728615625413879187695234"
+    # A full grid which clashes everywhere and a solution with its last digit changed
+    for grid in ("1" * 81, solution[:-1] + "1"):
+        puzzle = Sudoku()
+        puzzle.load_sud(grid)
+        puzzle.initialize()
+        report = puzzle.solve_logically(record_history=False)
+        assert report.in_error and not report.solved
+
+
+@pytest.mark.parametrize("backend", ["checkpoint", "journal"])
+def test_sudoku_search(backend):
+    # hard_Inkala from sudoku.yaml, the logical rules get stuck on it
+    inkala = "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+    puzzle = Sudoku(history_backend=backend)
+    puzzle.load_sud(inkala)
+    puzzle.initialize()
+    assert not puzzle.solve_logically(record_history=False).solved
+    puzzle.initialize()
+    report = puzzle.search()
+    assert report.solved and puzzle.solved and not puzzle.in_error
+    assert report.nodes > len(report.path) > 0
+    assert report.depth >= len(report.path)
+    assert 0 < report.backtracks < report.nodes
+    solution = puzzle._solutions
+    # The path to the solution is in the history, speculative solutions included
+    names = [rule.name for rule in puzzle.history.rule_queue]
+    assert sum(name.startswith("speculative_solution") for name in names) == len(
+        report.path
+    )
+    while not puzzle.history.at_beginning:
+        puzzle.replay_history("back")
+    assert not puzzle.solved
+    while not puzzle.history.at_end:
+        puzzle.replay_history("forward")
+    assert puzzle._solutions == solution
+
+
+def test_sudoku_search_gives_up():
+    inkala = "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+    puzzle = Sudoku()
+    puzzle.load_sud(inkala)
+    puzzle.initialize()
+    before = puzzle.snapshot()
+    report = puzzle.search(max_nodes=3)
+    assert not report.solved and report.nodes == 3
+    assert puzzle.snapshot() == before
+    # Contradicting givens are a dead end straight away
+    puzzle.load_sud("22" + "0" * 79)
+    puzzle.initialize()
+    report = puzzle.search(record_history=False)
+    assert not report.solved and report.nodes == 1 and report.depth == 0
+    # So is a full grid which isn't a solution
+    puzzle.load_sud("1" * 81)
+    puzzle.initialize()
+    report = puzzle.search(record_history=False)
+    assert not report.solved and puzzle.in_error
@@ -0,0 +1,60 @@
+from sudoku.topology import (
+    CELL_UNITS,
+    CELL_UNIT_POS,
+    NEXT,
+    PEERS,
+    ROW_MAJOR,
+    CELL_SUBLINES,
+    SUBLINE_NEIGHBOURS,
+    SUBLINE_UNITS,
+    SUBLINES,
+    UNITS,
+    cell_id,
+)
+
+
+def test_topology_units():
+    assert len(UNITS) == 27
+    for unit in UNITS:
+        assert len(set(unit)) == 9
+    assert UNITS[0] == (0, 1, 2, 9, 10, 11, 18, 19, 20)
+    assert UNITS[9] == (0, 3, 6, 27, 30, 33, 54, 57, 60)
+    assert UNITS[18] == tuple(range(9))
+    assert sorted(ROW_MAJOR) == list(range(81))
+    assert cell_id(8, 8) == 80
+    for i in range(81):
+        for u, pos in zip(CELL_UNITS[i], CELL_UNIT_POS[i]):
+            assert UNITS[u][pos] == i
+
+
+def test_topology_peers_and_next():
+    for i in range(81):
+        assert len(PEERS[i]) == 20
+        assert i not in PEERS[i]
+    assert NEXT["row"][2] == 9
+    assert NEXT["row"][26] == 6
+    assert NEXT["col"][6] == 27
+    assert NEXT["square"][8] == 0
+
+
+def test_topology_sublines():
+    assert len(SUBLINES) == 54
+    overlap, square_non_over_lap, line_non_over_lap = SUBLINES[0]
+    assert overlap == (0, 3, 6)
+    assert set(square_non_over_lap) == {1, 2, 4, 5, 7, 8}
+    assert line_non_over_lap == (27, 30, 33, 54, 57, 60)
+    overlap, square_non_over_lap, line_non_over_lap = SUBLINES[3]
+    assert overlap == (0, 1, 2)
+    assert square_non_over_lap == (3, 4, 5, 6, 7, 8)
+    assert line_non_over_lap == (9, 10, 11, 18, 19, 20)
+
+    assert SUBLINE_UNITS[0] == (9, 18)
+    assert SUBLINE_UNITS[3] == (0, 18)
+    # The non overlaps are made of the overlaps of the neighbouring sublines
+    for i, (_, square_non_over_lap, line_non_over_lap) in enumerate(SUBLINES):
+        square_peers, line_peers = SUBLINE_NEIGHBOURS[i]
+        assert set(square_non_over_lap) == {
+            c for j in square_peers for c in SUBLINES[j][0]
+        }
+        assert set(line_non_over_lap) == {c for j in line_peers for c in SUBLINES[j][0]}
+    assert CELL_SUBLINES[0] == (0, 3)